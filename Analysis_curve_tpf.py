@@ -14,47 +14,18 @@ import plotly.graph_objects as go
 import json
 import unicodedata
 import re
+from statistiques_courbes import statistiques_groupees
+from rapport_mesure import charger_rapport, table_courbes, fun_groupe
 
 file_path = "report2025-01-08_13-28.csv"
 r_min_choix = 0
 r_max_choix = 600
 
-# Options avancées pour charger un fichier efficacement
-df = pd.read_csv(file_path,
-    na_values=["N/A", "NA", "-", " "],    # Gérer les valeurs manquantes
-    chunksize=None,                       # Lire tout d'un coup, ou par morceaux si fichier volumineux
-    low_memory=False,                     # Accélère les fichiers complexes,
-    encoding = 'latin-1'
-)
-
-# Fonction pour transformer les nombres rationnels des rayons
-def transformer_rationnels(x):
-    if isinstance(x, (int, float)) and x != 0:
-        # Vérifie si le nombre est rationnel sous forme décimale périodique
-        if -1 < x < 1 and not np.isinf(1/x):
-            return round(abs(1 / x))
-    return x  # Garde les autres nombres inchangés
-
-df['Nom_Infrastructure_Horizontal geometry'] =\
-    df['Nom_Infrastructure_Horizontal geometry'].apply(transformer_rationnels)
-
-def fun_groupe(df,ligne,r_min, r_max):
-
-    df_filtre = df[(df['Nom_Infrastructure_Horizontal geometry'] >= r_min) &
-    (df['Nom_Infrastructure_Horizontal geometry']<=r_max) &
-    (df['Linie']==ligne)]
-
-    df_filtre['groupe'] = (df_filtre['Nom_Infrastructure_Horizontal geometry'] != df_filtre['Nom_Infrastructure_Horizontal geometry'].shift()).cumsum()
-    df_filtre['CAL Riffel 10-100 l'] =df_filtre['ATM Riffel 10-30 l']+df_filtre['ATM Riffel 30-100 l']
-    df_filtre['CAL Riffel 30-300 l'] =df_filtre['ATM Riffel 30-100 l']+df_filtre['ATM Riffel 100-300 l']
-    df_filtre['CAL Riffel 10-100 r'] = df_filtre['ATM Riffel 10-30 r'] + df_filtre['ATM Riffel 30-100 r']
-    df_filtre['CAL Riffel 30-300 r'] = df_filtre['ATM Riffel 30-100 r'] + df_filtre['ATM Riffel 100-300 r']
-    df_filtre['km_debut'] = df_filtre['von'].groupby(df_filtre['groupe']).transform('min')
-    df_filtre['km_fin'] = df_filtre['bis'].groupby(df_filtre['groupe']).transform('max')
-    df_filtre['rayon_courbe'] = df_filtre['Nom_Infrastructure_Horizontal geometry'].groupby(df_filtre['groupe']).transform('mean')
-    df_filtre["long"] = df_filtre["bis"]-df_filtre["von"]
-    #df_filtre = df_filtre.sort_values(by='von')
-    return df_filtre
+lignes_retenues = ['Palezieux - Chatel-St-Denis', 'Chatel-St-Denis - Montbovon']
+
+# Rapport nettoyé lu depuis le cache Parquet (reconstruit en flux si le CSV est plus récent)
+df = charger_rapport(file_path, lignes=lignes_retenues)
+rapport = {ligne: df[df['Linie'] == ligne] for ligne in lignes_retenues}
 
 def boxplot_wavelength(df):
     fig = plt.subplots(2, 3, figsize = (12,6))
@@ -83,10 +54,17 @@ def boxplot_wavelength(df):
     sns.boxplot(x='groupe', y='ATM Riffel 300-1000 r', data=df, showfliers=False)
     plt.ylim(0, 0.3)
 
-pal_csd = fun_groupe(df,'Palezieux - Chatel-St-Denis',r_min_choix,r_max_choix)
-pal_csd_tot = fun_groupe(df,'Palezieux - Chatel-St-Denis',0,60000)
-csd_mbv = fun_groupe(df,'Chatel-St-Denis - Montbovon',r_min_choix,r_max_choix)
-csd_mbv_tot = fun_groupe(df,'Chatel-St-Denis - Montbovon',0,60000)
+# Table des courbes (plages de rayon constant) calculée une fois par ligne
+courbes = {ligne: table_courbes(rapport[ligne]) for ligne in lignes_retenues}
+
+pal_csd = fun_groupe(rapport['Palezieux - Chatel-St-Denis'],'Palezieux - Chatel-St-Denis',r_min_choix,r_max_choix,
+                     courbes['Palezieux - Chatel-St-Denis'])
+pal_csd_tot = fun_groupe(rapport['Palezieux - Chatel-St-Denis'],'Palezieux - Chatel-St-Denis',0,60000,
+                         courbes['Palezieux - Chatel-St-Denis'])
+csd_mbv = fun_groupe(rapport['Chatel-St-Denis - Montbovon'],'Chatel-St-Denis - Montbovon',r_min_choix,r_max_choix,
+                     courbes['Chatel-St-Denis - Montbovon'])
+csd_mbv_tot = fun_groupe(rapport['Chatel-St-Denis - Montbovon'],'Chatel-St-Denis - Montbovon',0,60000,
+                         courbes['Chatel-St-Denis - Montbovon'])
 
 reseau = [pal_csd, csd_mbv]
 reseau = pd.concat(reseau)
@@ -102,21 +80,13 @@ def data_25_max(df_line):
                              #'ATM Riffel 300-1000 r'
                              ]].max(axis=1)
 
-    # Création des listes pour x et y avec gestion des trous
-    x_values = []
-    y_values_l = []
-    y_values_r = []
-
-    for i in range(len(df_line['von'])):
-        x_values.append(df_line['von'].iloc[i])
-        y_values_l.append(data_25cm_max_l.iloc[i])
-        y_values_r.append(data_25cm_max_r.iloc[i])
-
-        # Ajouter un trou si les données ne sont pas contiguës
-        if i < len(df_line['von']) - 1 and df_line['von'].iloc[i + 1] != df_line['von'].iloc[i] + 0.25:
-            x_values.append(None)
-            y_values_l.append(None)
-            y_values_r.append(None)
+    # Création des tableaux x et y avec gestion des trous: un NaN est inséré
+    # après chaque mesure dont la suivante n'est pas contiguë (pas de 0.25)
+    von = df_line['von'].to_numpy(dtype=float)
+    trous = np.flatnonzero(np.diff(von) != 0.25) + 1
+    x_values = np.insert(von, trous, np.nan)
+    y_values_l = np.insert(data_25cm_max_l.to_numpy(dtype=np.float32), trous, np.nan)
+    y_values_r = np.insert(data_25cm_max_r.to_numpy(dtype=np.float32), trous, np.nan)
 
     # Création du graphe avec un seul scatter
     fig = go.Figure()
@@ -269,87 +239,26 @@ def reserve_usure_par_courbe_plot(line_riffel):
 
 
 
-#- Skewness par courbe:
-# Calcul du skewness par groupe en filtrant les cas problématiques
-def safe_skew(values):
-    if len(values) > 1 and values.std() > 0:  # Vérifie qu'il y a au moins 2 valeurs et une variance non nulle
-        return skew(values)
-    else:
-        return 0  # Retourne 0 comme valeur par défaut si le calcul n'est pas possible
-
 def output_riffel(df, gw):
     riffel_type = ['CAL Riffel 10-100 l', 'CAL Riffel 10-100 r',
                    'CAL Riffel 30-300 l', 'CAL Riffel 30-300 r',
                    'ATM Riffel 300-1000 l', 'ATM Riffel 300-1000 r']
-    df1 = df.dropna(subset=riffel_type[0]).groupby('groupe')[riffel_type[0]]
-    skewness_par_courbe_10_100_l = df1.apply(safe_skew)
-    kurtosis_par_courbe_10_100_l  = df1.apply(kurtosis)
-    median_10_100_l = df1.median()
-    mean_10_100_l = df1.mean()
-
-    df2 = df.dropna(subset=riffel_type[1]).groupby('groupe')[riffel_type[1]]
-    skewness_par_courbe_10_100_r = df2.apply(safe_skew)
-    kurtosis_par_courbe_10_100_r = df2.apply(kurtosis)
-    median_10_100_r = df2.median()
-    mean_10_100_r = df2.mean()
-
-    df3 = df.dropna(subset=riffel_type[2]).groupby('groupe')[riffel_type[2]]
-    skewness_par_courbe_30_300_l = df3.apply(safe_skew)
-    kurtosis_par_courbe_30_300_l = df3.apply(kurtosis)
-    median_30_300_l = df3.median()
-    mean_30_300_l = df3.mean()
-
-    df4 = df.dropna(subset=riffel_type[3]).groupby('groupe')[riffel_type[3]]
-    skewness_par_courbe_30_300_r = df4.apply(safe_skew)
-    kurtosis_par_courbe_30_300_r = df4.apply(kurtosis)
-    median_30_300_r = df4.median()
-    mean_30_300_r = df4.mean()
-
-    df5 = df.dropna(subset=riffel_type[4]).groupby('groupe')[riffel_type[4]]
-    skewness_par_courbe_300_1000_l = df5.apply(safe_skew)
-    kurtosis_par_courbe_300_1000_l = df5.apply(kurtosis)
-    median_300_1000_l = df5.median()
-    mean_300_1000_l = df5.mean()
-
-    df6 = df.dropna(subset=riffel_type[5]).groupby('groupe')[riffel_type[5]]
-    skewness_par_courbe_300_1000_r = df6.apply(safe_skew)
-    kurtosis_par_courbe_300_1000_r = df6.apply(kurtosis)
-    median_300_1000_r = df6.median()
-    mean_300_1000_r = df6.mean()
-
-    km_debut = df.groupby('groupe')['km_debut'].max()
-    groupe = df.groupby('groupe')['groupe'].max()
-    km_fin = df.groupby('groupe')['km_fin'].max()
-    rayon = df.groupby('groupe')['rayon_courbe'].max()
-    linie = df.groupby('groupe')['Linie'].first()
-    stat_par_courbe = {'Linie': linie, 'groupe': groupe,
-                       'Median_10_100_l': median_10_100_l,
-                       'Mean_10_100_l': mean_10_100_l,
-                       'Skewness_10_100_l': skewness_par_courbe_10_100_l,
-                       'Kurtosis_10_100_l': kurtosis_par_courbe_10_100_l,
-                       'Median_10_100_r': median_10_100_r,
-                       'Mean_10_100_r': mean_10_100_r,
-                       'Skewness_10_100_r': skewness_par_courbe_10_100_r,
-                       'Kurtosis_10_100_r': kurtosis_par_courbe_10_100_r,
-                       'Median_30_300_l': median_30_300_l,
-                       'Mean_30_300_l': mean_30_300_l,
-                       'Skewness_30_300_l': skewness_par_courbe_30_300_l,
-                       'Kurtosis_30_300_l': kurtosis_par_courbe_30_300_l,
-                       'Median_30_300_r': median_30_300_r,
-                       'Mean_30_300_r': mean_30_300_r,
-                       'Skewness_30_300_r': skewness_par_courbe_30_300_r,
-                       'Kurtosis_30_300_r': kurtosis_par_courbe_30_300_r,
-                       'Median_300_1000_l': median_300_1000_l,
-                       'Mean_300_1000_l': mean_300_1000_l,
-                       'Skewness_300_1000_l': skewness_par_courbe_300_1000_l,
-                       'Kurtosis_300_1000_l': kurtosis_par_courbe_300_1000_l,
-                       'Median_300_1000_r': median_300_1000_r,
-                       'Mean_300_1000_r': mean_300_1000_r,
-                       'Skewness_300_1000_r': skewness_par_courbe_300_1000_r,
-                       'Kurtosis_300_1000_r': kurtosis_par_courbe_300_1000_r,
-                       'km_debut': km_debut,
-                       'km_fin': km_fin,
-                       'rayon': rayon}
+    # Statistiques des six bandes en une passe, à partir des bornes de groupes triées
+    cles, stats = statistiques_groupees(df['groupe'].to_numpy(), df[riffel_type].to_numpy())
+    suffixes = ['10_100_l', '10_100_r', '30_300_l', '30_300_r', '300_1000_l', '300_1000_r']
+
+    infos = df.groupby('groupe').agg(Linie=('Linie', 'first'), groupe=('groupe', 'max'),
+                                     km_debut=('km_debut', 'max'), km_fin=('km_fin', 'max'),
+                                     rayon=('rayon_courbe', 'max'))
+    stat_par_courbe = {'Linie': infos['Linie'], 'groupe': infos['groupe']}
+    for j, suffixe in enumerate(suffixes):
+        stat_par_courbe[f'Median_{suffixe}'] = pd.Series(stats['median'][:, j], index=cles)
+        stat_par_courbe[f'Mean_{suffixe}'] = pd.Series(stats['mean'][:, j], index=cles)
+        stat_par_courbe[f'Skewness_{suffixe}'] = pd.Series(stats['skew'][:, j], index=cles)
+        stat_par_courbe[f'Kurtosis_{suffixe}'] = pd.Series(stats['kurtosis'][:, j], index=cles)
+    stat_par_courbe.update({'km_debut': infos['km_debut'],
+                            'km_fin': infos['km_fin'],
+                            'rayon': infos['rayon']})
     stat_curve = pd.DataFrame.from_dict(stat_par_courbe)
     stat_curve['length'] = [x - y for x,y in zip(stat_curve['km_fin'],stat_curve['km_debut'])]
     stat_curve['max_l'] = stat_curve[['Median_10_100_l', 'Median_30_300_l',
@@ -4,8 +4,8 @@ import dash_html_components as html
 import pandas as pd
 import plotly.graph_objects as go
 
-# 🔹 Chargement du fichier CSV
-df = pd.read_csv("../segments_avec_km.csv")
+# 🔹 Chargement de la couche des segments (GeoParquet, voir couches_geo.py)
+df = pd.read_parquet("../segments_avec_km.parquet")
 
 # 🔹 Vérification et correction des inversions km_start/km_end
 df[["km_start", "km_end"]] = df.apply(
@@ -4,8 +4,8 @@ import dash_html_components as html
 import pandas as pd
 import plotly.graph_objects as go
 
-# 🔹 Chargement du fichier CSV
-df = pd.read_csv("../segments_avec_km.csv")  # Remplace avec ton fichier
+# 🔹 Chargement de la couche des segments (GeoParquet, voir couches_geo.py)
+df = pd.read_parquet("../segments_avec_km.parquet")  # Remplace avec ton fichier
 
 # 🔹 Assurer que les types de traverses sont bien catégorisés
 df["typ_trav"] = df["typ_trav"].astype(str).fillna("Inconnu")  # Remplit les valeurs manquantes
@@ -0,0 +1,91 @@
+// Synchronisation de l'axe x entre les graphes liés, exécutée dans le navigateur.
+// Le zoom d'un graphe est recopié sur les autres avec Plotly.relayout (sans passer
+// par le serveur Python), puis la plage est enregistrée dans le Store "range-store",
+// utilisé par le zoom depuis le tableau (vide après une échelle automatique ou un
+// changement de ligne). La réduction des points côté serveur n'est
+// relancée (Store "plage-decimation") qu'une fois la plage stable depuis
+// DELAI_DECIMATION_MS, et non à chaque événement de zoom ou de déplacement.
+const DELAI_DECIMATION_MS = 400;
+const etat_decimation = {jeton: 0};
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    synchronisation: {
+        synchroniser_axe_x: function () {
+            const ctx = window.dash_clientside.callback_context;
+            const args = Array.prototype.slice.call(arguments);
+            const current_store = args[args.length - 1] || {};
+            const selected_line = args[args.length - 2];
+            const graphes = ctx.inputs_list
+                .filter(input => input.property === "relayoutData")
+                .map(input => input.id);
+            const declencheur = ctx.triggered.length ? ctx.triggered[0].prop_id.split(".")[0] : null;
+
+            const new_store = Object.assign({}, current_store);
+            let updated = false;
+
+            const index = graphes.indexOf(declencheur);
+            if (index >= 0) {
+                const relayout = args[index] || {};
+                let new_range_x = null;
+                if ("xaxis.range" in relayout) {
+                    new_range_x = relayout["xaxis.range"];
+                } else if ("xaxis.range[0]" in relayout && "xaxis.range[1]" in relayout) {
+                    new_range_x = [relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]];
+                }
+
+                // Recopier la plage (ou l'échelle automatique) sur les autres graphes
+                graphes.filter(id => id !== declencheur).forEach(function (id) {
+                    const conteneur = document.getElementById(id);
+                    const gd = conteneur && conteneur.querySelector(".js-plotly-plot");
+                    if (!gd || !gd.layout) {
+                        return;
+                    }
+                    const range_actuel = gd.layout.xaxis && gd.layout.xaxis.range;
+                    if (new_range_x) {
+                        if (!range_actuel || range_actuel[0] !== new_range_x[0] || range_actuel[1] !== new_range_x[1]) {
+                            window.Plotly.relayout(gd, {"xaxis.range": new_range_x});
+                        }
+                    } else if (relayout["xaxis.autorange"] && !(gd.layout.xaxis && gd.layout.xaxis.autorange)) {
+                        window.Plotly.relayout(gd, {"xaxis.autorange": true});
+                    }
+                });
+
+                const store_x = current_store.xaxis;
+                if (new_range_x && !(store_x && store_x[0] === new_range_x[0] && store_x[1] === new_range_x[1])) {
+                    new_store.xaxis = new_range_x;
+                    updated = true;
+                } else if (!new_range_x && relayout["xaxis.autorange"] && store_x) {
+                    // Échelle automatique: plus de plage enregistrée, réduction sur toute l'étendue
+                    new_store.xaxis = null;
+                    updated = true;
+                }
+            }
+
+            // Changement de ligne: la plage de l'ancienne ligne n'est pas reprise
+            if (selected_line !== current_store.selected_line) {
+                new_store.selected_line = selected_line;
+                new_store.xaxis = null;
+                updated = true;
+            }
+
+            return updated ? new_store : window.dash_clientside.no_update;
+        },
+
+        redecimer_plage: function (store, plage) {
+            const jeton = ++etat_decimation.jeton;
+            return new Promise(function (resolve) {
+                setTimeout(function () {
+                    const x = store ? store.xaxis : null;
+                    const x_plage = plage ? plage.xaxis : null;
+                    const identique = x === x_plage || (x && x_plage && x[0] === x_plage[0] && x[1] === x_plage[1]);
+                    // Un appel plus récent est en attente, ou la plage est déjà réduite
+                    if (jeton !== etat_decimation.jeton || identique) {
+                        resolve(window.dash_clientside.no_update);
+                    } else {
+                        resolve({xaxis: x});
+                    }
+                }, DELAI_DECIMATION_MS);
+            });
+        }
+    }
+});
@@ -3,6 +3,8 @@ import unicodedata
 import re
 import numpy as np
 import matplotlib.pyplot as plt
+from intervalles import intersections_decoupees, fusion_intervalles
+from element_standard import encoder_element_standard, frequence_element_standard
 
 df_pal_csd = pd.read_csv("ANALYSIS_RIFFEL_Palezieux_Chatel_St_Denis.csv")
 df_csd_mbv = pd.read_csv("ANALYSIS_RIFFEL_Chatel_St_Denis_Montbovon.csv")
@@ -14,102 +16,25 @@ def attribution_StdE_troncon(df1, segments_superieurs, gw):
     df1["km_debut"] = df1["km_debut"] / 1000
     df1["km_fin"] = df1["km_fin"] / 1000
 
-    # Initialisation du dataframe résultant
-    segments_resultants = []
-
-    # Itérer sur chaque segment supérieur pour le croiser avec df1
-    for _, segment in segments_superieurs.iterrows():
-        km_start, km_end = segment["km_start"], segment["km_end"]
-        segment_copy = segment.copy()
-
-        # Trouver les tronçons de df1 qui intersectent ce segment
-        intersecting_troncons = df1[(df1["km_fin"] > km_start) & (df1["km_debut"] < km_end)]
-
-        for _, troncon in intersecting_troncons.iterrows():
-            km_debut, km_fin, rayon, groupe = troncon["km_debut"], troncon["km_fin"], troncon["rayon"],troncon["groupe"]
-
-            # Déterminer les nouvelles bornes du segment
-            new_km_debut = max(km_debut, km_start)
-            new_km_fin = min(km_fin, km_end)
-
-            # Créer une copie du segment avec le rayon attribué
-            new_segment = segment_copy.copy()
-            new_segment["km_start"] = new_km_debut
-            new_segment["km_end"] = new_km_fin
-            new_segment["rayon"] = rayon
-            new_segment["groupe"] = groupe
-
-            segments_resultants.append(new_segment)
-
-    # Transformer la liste en DataFrame
-    df_rayon = pd.DataFrame(segments_resultants)
-
-
-    # Fonction pour attribuer l'élément standard chiffré
-    def attribuer_element_standard(row):
-        A = 3  # Toujours 3
-        B = 1  # Toujours 1
-
-        # Déterminer C en fonction du rayon (colonne "rayon")
-        if pd.isna(row["rayon"]):
-            C = "C"  # Si valeur manquante, mettre C
-        elif row["rayon"] > 600:
-            C = 1
-        elif 300 < row["rayon"] <= 600:
-            C = 2
-        elif 120 < row["rayon"] <= 300:
-            C = 3
-        elif 80 < row["rayon"] <= 120:
-            C = 4
-        else:
-            C = 5
-
-        # Déterminer D en fonction du type de traverse (colonne "typ_trav")
-        if row["typ_trav"] == "Béton":
-            D = 1
-        elif row["typ_trav"] == "Bois":
-            D = 3
-        elif "Acier" in str(row["typ_trav"]):
-            D = 4
-        else:
-            D = "D"  # Si valeur inconnue
-
-        # Déterminer E en fonction du type de rail (colonne "typ_rail")
-        if "46 E1" in str(row["typ_rail"]):
-            E = 2
-        elif "54 E2" in str(row["typ_rail"]):
-            E = 1
-        else:
-            E = "E"
-
-        # Déterminer F en fonction de la qualité d'acier (colonne "qualite_acier")
-        if pd.isna(row["qualite_acier"]):
-            F = "F"
-        else:
-            F = 1 if row["qualite_acier"] == "R 260" else 2 if row["qualite_acier"] == "R 350 HT" else 3
-
-        # G et H sont toujours 1
-        G = 1
-        H = 1
-
-        # Construire la chaîne ABCDEFGH
-        return f"{A}{B}{C}{D}{E}{F}{G}{H}"
-
-    # Appliquer la fonction à chaque ligne
-    df_rayon["element_standard"] = df_rayon.apply(attribuer_element_standard, axis=1)
-
-    # Dictionnaire des fréquences associées aux éléments standards
-    frequence_mapping = {
-        "31112211": 0.000, "31212211": 0.000, "31312211": 0.067, "31412211": 0.100, "31512211": 0.120,
-        "31132211": 0.000, "31232211": 0.000, "31332211": 0.100, "31432211": 0.120, "31532211": 0.120,
-        "31142211": 0.000, "31242211": 0.000, "31342211": 0.075, "31442211": 0.100, "31542211": 0.133,
-        "31112111": 0.000, "31212111": 0.000, "31312111": 0.133, "31412111": 0.200, "31512111": 0.240,
-        "31132111": 0.000, "31232111": 0.000, "31332111": 0.133, "31432111": 0.200, "31532111": 0.240,
-        "31142111": 0.000, "31242111": 0.000, "31342111": 0.100, "31442111": 0.200, "31542111": 0.250,
-    }
+    # Croiser les segments supérieurs avec les tronçons de df1 (balayage sur les km triés)
+    idx_segment, idx_troncon, new_km_debut, new_km_fin = intersections_decoupees(
+        segments_superieurs["km_start"], segments_superieurs["km_end"],
+        df1["km_debut"], df1["km_fin"])
+
+    # Construire directement le DataFrame des segments découpés avec le rayon attribué
+    df_rayon = segments_superieurs.iloc[idx_segment].copy()
+    df_rayon["km_start"] = new_km_debut
+    df_rayon["km_end"] = new_km_fin
+    df_rayon["rayon"] = df1["rayon"].to_numpy()[idx_troncon]
+    df_rayon["groupe"] = df1["groupe"].to_numpy()[idx_troncon]
+
+
+    # Attribuer l'élément standard chiffré (règles dans element_standard_regles.json)
+    code, df_rayon["element_standard"] = encoder_element_standard(
+        df_rayon["rayon"], df_rayon["typ_trav"], df_rayon["typ_rail"], df_rayon["qualite_acier"])
 
     # Ajouter la colonne de fréquence en fonction de l'élément standard
-    df_rayon["frequence"] = df_rayon["element_standard"].map(frequence_mapping).fillna(0.14)
+    df_rayon["frequence"] = frequence_element_standard(code)
     # Réserve usure:
     #df["reserve_usure_min"] = df.merge(df1[['groupe','reserve_usure_min']],
                                  #  on="groupe", how='left')
@@ -141,36 +66,11 @@ def attribution_StdE_troncon(df1, segments_superieurs, gw):
     # FIGURE LINEAIRE OU MEULER?
     fig, ax = plt.subplots(1, 1, figsize=(12, 6))
     df_rayon_filtered = df_rayon[df_rayon["annee"] < 1]
-    df_rayon_filtered["zero"] = 0
-
-    # Trier par km_start
-    df_rayon_filtered = df_rayon_filtered.sort_values(by="km_start").reset_index(drop=True)
-    # Liste pour stocker les nouvelles lignes
-    new_rows = []
-    # Vérifier la distance entre km_end d'une ligne et km_start de la suivante
-    for i in range(len(df_rayon_filtered) - 1):
-        row_current = df_rayon_filtered.iloc[i]
-        row_next = df_rayon_filtered.iloc[i + 1]
-
-        gap = row_next["km_start"] - row_current["km_end"]
-
-        if gap < 0.15:  # Si l'écart est inférieur à 0.15 km (150m)
-            new_row = {
-                "km_start": row_current["km_end"],
-                "km_end": row_next["km_start"],
-                "zero": 0  # Même position Y
-            }
-            new_rows.append(new_row)
-
-    # Ajouter les nouvelles lignes fictives au DataFrame
-    df_fictive = pd.DataFrame(new_rows)
-    df_rayon_extended = pd.concat([df_rayon_filtered, df_fictive]).sort_values(by="km_start").reset_index(drop=True)
-
-
-    ax.hlines(df_rayon_extended['zero'],
-              df_rayon_extended['km_start'],
-              df_rayon_extended['km_end'],
-              linewidth=2, color='black')
+
+    # Relier les tronçons séparés de moins de 150 m (même position Y)
+    _, km_start_f, km_end_f, _ = fusion_intervalles(df_rayon_filtered["km_start"], df_rayon_filtered["km_end"],
+                                                    ecart_max=0.15)
+    ax.hlines(np.zeros(len(km_start_f)), km_start_f, km_end_f, linewidth=2, color='black')
 
     ax.set_xlabel("km")
     ax.set_title("Tronçons à meuler")
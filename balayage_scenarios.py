@@ -0,0 +1,144 @@
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory, util
+
+import numpy as np
+import pandas as pd
+
+from donnees_stde import FICHIERS_STDE, table_stde
+from optimisation_meulage import COUT_PAR_METRE
+from simulation_meulage import simuler_campagnes, GW_REFERENCE
+
+FICHIER_SCENARIOS = "scenarios_meulage.csv"
+# Colonnes partagées entre les processus (une ligne du bloc de mémoire partagée par colonne)
+COLONNES_PARTAGEES = ["km_start", "km_end", "frequence", "amplitude"]
+
+# Vues sur la mémoire partagée dans chaque processus de calcul
+_memoire = None
+_tables = {}
+
+
+def _attacher_memoire(nom):
+    """
+    Rattache un bloc de mémoire partagée existant sans l'inscrire au suivi des ressources:
+    seul le processus principal, qui l'a créé, le libère (unlink). Avant Python 3.13, le
+    suivi d'un processus de calcul pourrait sinon signaler ou supprimer le bloc à sa sortie.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=nom, track=False)
+    inscrire = resource_tracker.register
+    resource_tracker.register = lambda nom_ressource, type_ressource: None
+    try:
+        return shared_memory.SharedMemory(name=nom)
+    finally:
+        resource_tracker.register = inscrire
+
+
+def _fermer_memoire():
+    """Libère les vues puis ferme le bloc de mémoire partagée du processus de calcul."""
+    global _memoire
+    _tables.clear()
+    if _memoire is not None:
+        _memoire.close()
+        _memoire = None
+
+
+def _initialiser_processus(nom, forme, bornes):
+    """Rattache le processus au bloc de mémoire partagée et prépare une vue par ligne."""
+    global _memoire
+    _memoire = _attacher_memoire(nom)
+    donnees = np.ndarray(forme, dtype=np.float64, buffer=_memoire.buf)
+    for ligne, (debut, fin) in bornes.items():
+        _tables[ligne] = donnees[:, debut:fin]
+    # Fermeture à la sortie du processus de calcul (les processus enfants ne lancent pas atexit)
+    util.Finalize(None, _fermer_memoire, exitpriority=10)
+
+
+def _evaluer(ligne, gw, cout_par_metre, seuil_fusion, budgets, nb_annees):
+    """
+    Simule tous les budgets d'une combinaison (ligne, gw, coût, seuil de fusion) et résume
+    chaque scénario en une ligne.
+    """
+    km_start, km_end, frequence, amplitude = _tables[ligne]
+    # La réserve d'usure d'une courbe est gw - amplitude max. de Riffel
+    df_stde = pd.DataFrame({"km_start": km_start, "km_end": km_end, "frequence": frequence,
+                            "reserve_usure_min": gw - amplitude})
+    _, bilan = simuler_campagnes(df_stde, budgets, nb_annees=nb_annees, gw=gw,
+                                 cout_par_metre=cout_par_metre, seuil_fusion=seuil_fusion)
+
+    par_scenario = bilan.groupby("scenario")
+    resultat = pd.DataFrame({
+        "budget": np.asarray(budgets, dtype=float),
+        "cout_total": par_scenario["cout"].sum().to_numpy(),
+        "km_meules": par_scenario["km_meules"].sum().to_numpy(),
+        "km_en_retard_moyen": par_scenario["km_en_retard"].mean().to_numpy(),
+        "km_en_retard_final": par_scenario["km_en_retard"].last().to_numpy(),
+        "reserve_moyenne_finale": par_scenario["reserve_moyenne"].last().to_numpy(),
+    })
+    resultat.insert(0, "seuil_fusion", seuil_fusion)
+    resultat.insert(0, "cout_par_metre", cout_par_metre)
+    resultat.insert(0, "gw", gw)
+    resultat.insert(0, "ligne", ligne)
+    return resultat
+
+
+def balayer_scenarios(lignes=None, gw=(GW_REFERENCE,), budgets=(50000,), couts_par_metre=(COUT_PAR_METRE,),
+                      seuils_fusion=(0.0,), nb_annees=10, nb_processus=None, fichier=None):
+    """
+    Évalue une grille de scénarios (gw, budget, coût par mètre, seuil de fusion) sur
+    plusieurs lignes avec `simuler_campagnes`, en parallèle sur un pool de processus.
+
+    Les tables StdE (km, fréquence et amplitude max. de Riffel par tronçon) sont copiées
+    une seule fois dans un bloc de mémoire partagée lu par tous les processus. Un calcul
+    couvre tous les budgets d'une combinaison (ligne, gw, coût, seuil), simulés ensemble.
+    L'amplitude est déduite des tables calculées avec `GW_REFERENCE`
+    (reserve_usure_min = gw - amplitude).
+
+    :param lignes: Lignes à évaluer (None = toutes les lignes de `FICHIERS_STDE`)
+    :param nb_processus: Nombre de processus (None = nombre de cœurs)
+    :param fichier: Fichier CSV où écrire les résultats (None = pas d'écriture)
+    :return: DataFrame, une ligne par scénario et par ligne (coût total, km meulés,
+             km en retard moyen et final, réserve moyenne finale)
+    """
+    lignes = list(FICHIERS_STDE) if lignes is None else list(lignes)
+    budgets = list(budgets)
+
+    colonnes, bornes, debut = [], {}, 0
+    for ligne in lignes:
+        df = table_stde(ligne)
+        df = df[np.isfinite(df["annee"])]
+        colonnes.append(np.vstack([df["km_start"].to_numpy(dtype=float), df["km_end"].to_numpy(dtype=float),
+                                   df["frequence"].to_numpy(dtype=float),
+                                   GW_REFERENCE - df["reserve_usure_min"].to_numpy(dtype=float)]))
+        bornes[ligne] = (debut, debut + len(df))
+        debut += len(df)
+    donnees = np.hstack(colonnes)
+
+    memoire = shared_memory.SharedMemory(create=True, size=max(donnees.nbytes, 1))
+    try:
+        np.ndarray(donnees.shape, dtype=np.float64, buffer=memoire.buf)[:] = donnees
+        combinaisons = list(itertools.product(lignes, gw, couts_par_metre, seuils_fusion))
+        with ProcessPoolExecutor(max_workers=nb_processus or os.cpu_count(),
+                                 initializer=_initialiser_processus,
+                                 initargs=(memoire.name, donnees.shape, bornes)) as pool:
+            calculs = [pool.submit(_evaluer, ligne, g, c, s, budgets, nb_annees)
+                       for ligne, g, c, s in combinaisons]
+            resultats = pd.concat([calcul.result() for calcul in calculs], ignore_index=True)
+    finally:
+        memoire.close()
+        memoire.unlink()
+
+    if fichier is not None:
+        resultats.to_csv(fichier, index=False)
+    return resultats
+
+
+if __name__ == "__main__":
+    scenarios = balayer_scenarios(gw=(0.06, 0.08, 0.10),
+                                  budgets=np.arange(0, 200001, 10000),
+                                  couts_par_metre=(8, 10, 12),
+                                  seuils_fusion=(0.0, 0.19),
+                                  fichier=FICHIER_SCENARIOS)
+    print(f"{len(scenarios)} scénarios enregistrés : {FICHIER_SCENARIOS}")
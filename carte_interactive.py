@@ -0,0 +1,119 @@
+import json
+
+import folium
+import numpy as np
+import shapely
+from branca.element import MacroElement, Template
+from folium.plugins import FastMarkerCluster
+
+from couches_geo import colonne_simplifiee, niveau_geometrie, tolerances_disponibles
+
+# Zoom min. -> tolérance de simplification Douglas-Peucker [m] (0 = pleine résolution),
+# mêmes tolérances que les géométries précalculées de couches_geo.TOLERANCES_SIMPLIFICATION
+NIVEAUX_ZOOM = {0: 10.0, 14: 2.0, 16: 0.5}
+DECIMALES_WGS84 = 6  # ~0.1 m, suffisant pour l'affichage
+CHAMPS_POPUP = ["ligne", "km_start", "km_end", "typ_rail", "typ_trav", "qualite_acier", "etat"]
+COULEURS_RAIL = {
+    "CFF I": "#1f77b4",
+    "CFF IV": "#ff7f0e",
+    "UST 36": "#2ca02c",
+    "Ri 60": "#d62728",
+}
+COULEUR_DEFAUT = "blue"
+
+# Affiche la couche de chaque niveau seulement dans sa plage de zoom
+_BASCULE_ZOOM = Template("""
+{% macro script(this, kwargs) %}
+    (function() {
+        var carte = {{ this.carte }};
+        var niveaux = [{% for couche, zoom_min, zoom_max in this.niveaux %}
+            {couche: {{ couche }}, min: {{ zoom_min }}, max: {{ zoom_max }}},{% endfor %}
+        ];
+        function basculer() {
+            var zoom = carte.getZoom();
+            niveaux.forEach(function(n) {
+                if (zoom >= n.min && zoom < n.max) { carte.addLayer(n.couche); }
+                else { carte.removeLayer(n.couche); }
+            });
+        }
+        carte.on("zoomend", basculer);
+        basculer();
+    })();
+{% endmacro %}
+""")
+
+_MARQUEUR_KM = """
+function (ligne) {
+    var marqueur = L.circleMarker(new L.LatLng(ligne[0], ligne[1]), {radius: 3, color: "red"});
+    marqueur.bindPopup("Point km " + ligne[2]);
+    return marqueur;
+}
+"""
+
+
+class _BasculeZoom(MacroElement):
+    def __init__(self, carte, niveaux):
+        super().__init__()
+        self._template = _BASCULE_ZOOM
+        self.carte = carte.get_name()
+        self.niveaux = [(couche.get_name(), zoom_min, zoom_max) for couche, zoom_min, zoom_max in niveaux]
+
+
+def arrondir_coordonnees(geometries, decimales=DECIMALES_WGS84):
+    """Arrondit les coordonnées des géométries (réduit la taille du GeoJSON exporté)."""
+    return shapely.transform(np.asarray(geometries), lambda xy: np.round(xy, decimales))
+
+
+def exporter_carte(segments, points_km=None, fichier="map_interactive.html", niveaux=NIVEAUX_ZOOM,
+                   champs_popup=CHAMPS_POPUP, colonne_couleur="typ_rail", colonne_km="km_extrait"):
+    """
+    Carte Folium des segments de voie et des points kilométriques, exportée en HTML.
+
+    Les segments sont écrits en une couche GeoJSON par niveau de zoom (géométrie
+    simplifiée précalculée si la couche la contient, sinon simplifiée dans le CRS
+    métrique, puis convertie en WGS84); une seule couche est
+    affichée selon le zoom. Le style dépend de `colonne_couleur` et les popups utilisent
+    un modèle commun sur quelques champs, au lieu d'un texte par segment. Les points km
+    sont regroupés (clusters) à partir d'un seul tableau de coordonnées.
+
+    :param segments: GeoDataFrame des segments (CRS métrique)
+    :param points_km: GeoDataFrame des points kilométriques (None = pas de points)
+    :param niveaux: Dictionnaire {zoom min.: tolérance de simplification [m]}
+    :return: Carte folium
+    """
+    champs = [c for c in champs_popup if c in segments.columns]
+    colonnes = list(dict.fromkeys(champs + ([colonne_couleur] if colonne_couleur in segments.columns else [])))
+    geometrie = segments.geometry.name
+    simplifiees = [colonne_simplifiee(t, geometrie) for t in tolerances_disponibles(segments.columns, geometrie)]
+    segments = segments[colonnes + [geometrie] + simplifiees]
+
+    centre = niveau_geometrie(segments, max(niveaux.values())).to_crs(epsg=4326).geometry.union_all().centroid
+    carte = folium.Map(location=[centre.y, centre.x], zoom_start=12, tiles="CartoDB Positron")
+
+    def style(feature):
+        couleur = COULEURS_RAIL.get(feature["properties"].get(colonne_couleur), COULEUR_DEFAUT)
+        return {"color": couleur, "weight": 3, "opacity": 0.7}
+
+    zooms = sorted(niveaux)
+    couches = []
+    for i, zoom_min in enumerate(zooms):
+        niveau = niveau_geometrie(segments, niveaux[zoom_min]).to_crs(epsg=4326)
+        niveau.geometry = arrondir_coordonnees(niveau.geometry.values)
+        # GeoJSON sans bbox ni identifiant par entité
+        couche = folium.GeoJson(json.loads(niveau.to_json(drop_id=True)), name=f"Segments (zoom {zoom_min}+)",
+                                style_function=style,
+                                popup=folium.GeoJsonPopup(fields=champs) if champs else None,
+                                control=False)
+        couche.add_to(carte)
+        zoom_max = zooms[i + 1] if i + 1 < len(zooms) else 99
+        couches.append((couche, zoom_min, zoom_max))
+    carte.add_child(_BasculeZoom(carte, couches))
+
+    if points_km is not None:
+        points = points_km.to_crs(epsg=4326)
+        xy = np.round(shapely.get_coordinates(points.geometry.values), DECIMALES_WGS84)
+        donnees = np.column_stack([xy[:, 1], xy[:, 0], points[colonne_km].to_numpy(dtype=float)]).tolist()
+        FastMarkerCluster(donnees, callback=_MARQUEUR_KM, name="Points km").add_to(carte)
+
+    carte.save(fichier)
+    return carte
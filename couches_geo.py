@@ -0,0 +1,165 @@
+import json
+
+import geopandas as gpd
+import pandas as pd
+import pyarrow.parquet as pq
+import shapely
+
+# Format unique des couches: le fichier GeoParquet fait foi, sans copie shapefile ou CSV
+EXTENSION_COUCHE = ".parquet"
+# Tolérances Douglas-Peucker [m] des géométries simplifiées enregistrées avec les originales
+TOLERANCES_SIMPLIFICATION = (10.0, 2.0, 0.5)
+SUFFIXE_SIMPLIFICATION = "_dp"
+LARGEUR_VUE_PIXELS = 1000
+
+
+def chemin_couche(nom):
+    """Chemin du fichier GeoParquet d'une couche (l'extension est ajoutée si absente)."""
+    return nom if nom.endswith(EXTENSION_COUCHE) else nom + EXTENSION_COUCHE
+
+
+def colonne_simplifiee(tolerance, geometrie="geometry"):
+    """Nom de la colonne de la géométrie simplifiée à `tolerance` [m] (p. ex. "geometry_dp2")."""
+    return f"{geometrie}{SUFFIXE_SIMPLIFICATION}{tolerance:g}"
+
+
+def tolerances_disponibles(colonnes, geometrie="geometry"):
+    """Tolérances [m] des géométries simplifiées présentes parmi `colonnes`, triées."""
+    prefixe = geometrie + SUFFIXE_SIMPLIFICATION
+    return sorted(float(c[len(prefixe):]) for c in colonnes if c.startswith(prefixe))
+
+
+def ajouter_simplifications(gdf, tolerances=TOLERANCES_SIMPLIFICATION):
+    """
+    Ajoute à une couche une colonne géométrique simplifiée (Douglas-Peucker, topologie
+    conservée) par tolérance, calculée dans le CRS métrique de la couche.
+
+    :param tolerances: Tolérances de simplification [m]
+    :return: Copie du GeoDataFrame avec les colonnes "<geometrie>_dp<tolérance>"
+    :raise ValueError: si le CRS de la couche n'est pas projeté (tolérances en mètres)
+    """
+    if gdf.crs is None or not gdf.crs.is_projected:
+        raise ValueError("Les géométries simplifiées sont calculées dans un CRS projeté (en mètres)")
+    gdf = gdf.copy()
+    geometries = gdf.geometry.values
+    for tolerance in tolerances:
+        gdf[colonne_simplifiee(tolerance, gdf.geometry.name)] = gpd.GeoSeries(
+            shapely.simplify(geometries, tolerance, preserve_topology=True), index=gdf.index, crs=gdf.crs)
+    return gdf
+
+
+def ecrire_couche(gdf, nom, tolerances=None):
+    """
+    Écrit une couche géographique en GeoParquet: un seul fichier colonne par colonne,
+    géométrie en WKB et CRS dans les métadonnées (remplace shapefile + CSV en WKT).
+
+    :param tolerances: Tolérances [m] des géométries simplifiées à enregistrer avec
+                       l'originale (None = géométrie originale seulement)
+    :return: Chemin du fichier écrit
+    """
+    chemin = chemin_couche(nom)
+    if tolerances:
+        gdf = ajouter_simplifications(gdf, tolerances)
+    gdf.to_parquet(chemin, index=False)
+    return chemin
+
+
+def simplifier_couche(nom, tolerances=TOLERANCES_SIMPLIFICATION):
+    """
+    Prétraitement: réécrit une couche existante avec ses géométries simplifiées aux
+    `tolerances` [m], à côté de la géométrie originale.
+
+    :return: Chemin du fichier écrit
+    """
+    gdf = gpd.read_parquet(chemin_couche(nom))
+    geometrie = gdf.geometry.name
+    gdf = gdf.drop(columns=[colonne_simplifiee(t, geometrie) for t in tolerances_disponibles(gdf.columns, geometrie)])
+    return ecrire_couche(gdf, nom, tolerances)
+
+
+def colonnes_geometrie(nom):
+    """Colonnes géométriques d'une couche, lues dans les métadonnées GeoParquet (sans lire les données)."""
+    metadonnees = pq.read_schema(chemin_couche(nom)).metadata or {}
+    if b"geo" not in metadonnees:
+        return []
+    return list(json.loads(metadonnees[b"geo"])["columns"])
+
+
+def lire_attributs(nom, colonnes=None):
+    """
+    Lit uniquement les colonnes attributaires d'une couche, pour les traitements non
+    géographiques: les colonnes géométriques ne sont ni lues ni décodées.
+
+    :param colonnes: Colonnes à lire (None = toutes les colonnes attributaires)
+    :return: DataFrame pandas
+    """
+    chemin = chemin_couche(nom)
+    if colonnes is None:
+        geometrie = set(colonnes_geometrie(chemin))
+        colonnes = [c for c in pq.read_schema(chemin).names if c not in geometrie]
+    return pd.read_parquet(chemin, columns=list(colonnes))
+
+
+def choisir_tolerance(tolerances, resolution):
+    """
+    Tolérance la plus grande qui reste sous la résolution demandée (la simplification
+    n'est alors pas visible), 0 si aucune ne convient.
+
+    :param tolerances: Tolérances disponibles [m]
+    :param resolution: Taille d'un pixel de la vue [m]
+    """
+    convenables = [t for t in tolerances if t <= resolution]
+    return max(convenables) if convenables else 0.0
+
+
+def resolution_vue(limites, largeur_pixels=LARGEUR_VUE_PIXELS):
+    """Taille d'un pixel [m] d'une vue couvrant `limites` (minx, miny, maxx, maxy) en CRS métrique."""
+    minx, miny, maxx, maxy = limites
+    return max(maxx - minx, maxy - miny) / largeur_pixels
+
+
+def niveau_geometrie(gdf, tolerance):
+    """
+    Couche avec la géométrie au niveau de simplification `tolerance` comme seule colonne
+    géométrique: la géométrie précalculée si elle existe, sinon simplifiée à la volée
+    (0 = géométrie originale).
+
+    :return: GeoDataFrame (géométrie active sous son nom d'origine, dans le CRS de la couche)
+    """
+    geometrie = gdf.geometry.name
+    autres = [c for c in gdf.columns if c != geometrie and isinstance(gdf[c].dtype, gpd.array.GeometryDtype)]
+    colonne = colonne_simplifiee(tolerance, geometrie)
+    resultat = gdf.drop(columns=autres)
+    if tolerance > 0 and colonne in gdf.columns:
+        resultat[geometrie] = gdf[colonne]
+    elif tolerance > 0:
+        resultat[geometrie] = gpd.GeoSeries(shapely.simplify(gdf.geometry.values, tolerance, preserve_topology=True),
+                                            index=gdf.index, crs=gdf.crs)
+    return resultat
+
+
+def lire_couche(nom, colonnes=None, resolution=None):
+    """
+    Lit une couche avec sa géométrie (décodée en shapely) et son CRS.
+
+    Avec `resolution`, seule la géométrie simplifiée adaptée à la vue est lue (voir
+    `choisir_tolerance`), au lieu de la géométrie originale et de tous ses niveaux.
+
+    :param colonnes: Colonnes attributaires à lire en plus de la géométrie (None = toutes)
+    :param resolution: Taille d'un pixel de la vue [m] (None = toutes les géométries)
+    :return: GeoDataFrame
+    """
+    chemin = chemin_couche(nom)
+    geometries = colonnes_geometrie(chemin)
+    if resolution is None:
+        if colonnes is not None:
+            colonnes = list(colonnes) + [c for c in geometries if c not in colonnes]
+        return gpd.read_parquet(chemin, columns=colonnes)
+
+    primaire = json.loads(pq.read_schema(chemin).metadata[b"geo"])["primary_column"]
+    tolerance = choisir_tolerance(tolerances_disponibles(geometries, primaire), resolution)
+    colonne = colonne_simplifiee(tolerance, primaire) if tolerance > 0 else primaire
+    if colonnes is None:
+        colonnes = [c for c in pq.read_schema(chemin).names if c not in geometries]
+    gdf = gpd.read_parquet(chemin, columns=list(colonnes) + [colonne])
+    return gdf.rename_geometry(primaire) if colonne != primaire else gdf
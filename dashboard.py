@@ -1,12 +1,16 @@
-from dash import dcc, html, callback_context, dash_table
+from dash import dcc, html, callback_context, dash_table, Patch
 import plotly.io as pio
 import dash.exceptions
-import copy
+import os
+from functools import lru_cache
 import dash
 import plotly.express as px
-from dash.dependencies import Input, Output, State
+from dash.dependencies import Input, Output, State, ClientsideFunction
 import plotly.graph_objects as go
-import pandas as pd
+import numpy as np
+from decimation import points_decimes, SEUIL_DECIMATION
+from donnees_stde import FICHIERS_STDE, table_affichage_stde
+from optimisation_meulage import sections_meulage, programme_meulage, COUT_PAR_METRE, COUT_MOBILISATION
 
 # Color concept
 color_background_div = "#3a3a41"
@@ -210,6 +214,7 @@ sidebar = html.Div(children=[
 main_layout = html.Div([
 
     dcc.Store(id="range-store", data=init_store_data),
+    dcc.Store(id="plage-decimation", data={"xaxis": None}),
 
     html.Div([
         html.Span("Besoin en meulage sur la ligne",
@@ -354,8 +359,10 @@ def update_zoom_on_click(active_cell, table_data, current_store):
     return new_store
 
 
-# --- Callback pour sauvegarder le zoom et la ligne sélectionnée ---
-@app.callback(
+# --- Synchronisation du zoom entre les graphes, côté navigateur (assets/synchronisation_axes.js) ---
+# La plage est aussi sauvegardée dans le Store, avec la ligne sélectionnée
+app.clientside_callback(
+    ClientsideFunction(namespace="synchronisation", function_name="synchroniser_axe_x"),
     Output("range-store", "data"),
     Input("graph-1", "relayoutData"),
     Input("graph-2", "relayoutData"),
@@ -363,124 +370,125 @@ def update_zoom_on_click(active_cell, table_data, current_store):
     State("range-store", "data"),
     prevent_initial_call=True
 )
-def update_range(relayout1, relayout2, selected_line, current_store):
-    ctx = callback_context
-    if not ctx.triggered:
-        raise dash.exceptions.PreventUpdate
-
-    triggered_prop = ctx.triggered[0]['prop_id'].split('.')[0]
-    relayout = relayout1 if triggered_prop == "graph-1" else relayout2
-
-    new_store = current_store.copy()
-    updated = False
 
-    if relayout:
-        if "xaxis.range" in relayout:
-            new_range_x = relayout["xaxis.range"]
+# --- Réduction des points côté serveur, relancée seulement quand la plage est stable ---
+# (zoom et déplacement successifs regroupés dans le navigateur, voir redecimer_plage)
+app.clientside_callback(
+    ClientsideFunction(namespace="synchronisation", function_name="redecimer_plage"),
+    Output("plage-decimation", "data"),
+    Input("range-store", "data"),
+    State("plage-decimation", "data"),
+    prevent_initial_call=True
+)
 
-        elif "xaxis.range[0]" in relayout and "xaxis.range[1]" in relayout:
-            new_range_x = [relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]]
 
-        else:
-            new_range_x = None
+# Dictionnaire pour mapper les noms de lignes aux fichiers JSON
+FICHIERS_FIGURES = {
+    "Palézieux - Châtel-St-Denis": ("reserve_usure_Palezieux___Chatel_St_Denis.json",
+                                    "data_25_cm_Palezieux___Chatel_St_Denis.json"),
+    "Châtel-St-Denis - Montbovon": ("reserve_usure_Chatel_St_Denis___Montbovon.json",
+                                    "data_25_cm_Chatel_St_Denis___Montbovon.json"),
+}
 
-        if new_range_x and new_range_x != current_store.get("xaxis"):
-            new_store["xaxis"] = new_range_x
-            updated = True
 
-    if selected_line != current_store.get("selected_line"):
-        new_store["selected_line"] = selected_line
-        updated = True
+@lru_cache(maxsize=8)
+def figures_de_base(selected_line, versions):
+    """
+    Figures lues et mises en forme une seule fois par ligne et par version des fichiers
+    (`versions` = dates de modification), conservées sous forme de dictionnaires.
+    Les longues traces sont converties en tableaux NumPy pour la réduction min-max.
+    Les figures en cache ne doivent pas être modifiées.
+    """
+    file1, file2 = FICHIERS_FIGURES[selected_line]
+    fig1 = format_figure(pio.read_json(file1), selected_line).to_dict()
+    fig2 = format_figure(pio.read_json(file2), selected_line).to_dict()
+    for trace in fig2["data"]:
+        if len(trace.get("x", [])) > SEUIL_DECIMATION:
+            trace["x"] = np.asarray(trace["x"], dtype=float)
+            trace["y"] = np.asarray(trace["y"], dtype=float)
+    return fig1, fig2
 
-    if updated:
-        return new_store
 
-    else:
-        raise dash.exceptions.PreventUpdate
+def charger_figures(selected_line):
+    versions = tuple(os.path.getmtime(f) for f in FICHIERS_FIGURES[selected_line])
+    return figures_de_base(selected_line, versions)
 
 
 @app.callback(
     Output("graph-1", "figure"),
     Output("graph-2", "figure"),
     Input("line-selector", "value"),
-    Input("range-store", "data"),
+    Input("plage-decimation", "data"),
+    State("range-store", "data"),
 )
-def update_graphs(selected_line, store_data):
+def update_graphs(selected_line, plage_decimation, store_data):
     """
-    Met à jour les figures lorsque l'utilisateur change de ligne
-    et applique le zoom sauvegardé.
+    Met à jour les figures lorsque l'utilisateur change de ligne (toute l'étendue
+    de la nouvelle ligne). Le zoom et le déplacement sont synchronisés dans le
+    navigateur; le serveur n'est appelé que pour réduire les points une fois la plage
+    stable (`plage-decimation`).
     """
-    # Dictionnaire pour mapper les noms de lignes aux fichiers JSON
-    file_map = {
-        "Palézieux - Châtel-St-Denis": ("reserve_usure_Palezieux___Chatel_St_Denis.json",
-                                        "data_25_cm_Palezieux___Chatel_St_Denis.json"),
-        "Châtel-St-Denis - Montbovon": ("reserve_usure_Chatel_St_Denis___Montbovon.json",
-                                        "data_25_cm_Chatel_St_Denis___Montbovon.json"),
-    }
-
     # Vérifier si la ligne est valide
-    if selected_line not in file_map:
+    if selected_line not in FICHIERS_FIGURES:
         raise dash.exceptions.PreventUpdate
 
-    file1, file2 = file_map[selected_line]
-
     try:
-        fig1 = pio.read_json(file1)
-        fig2 = pio.read_json(file2)
+        fig1, fig2 = charger_figures(selected_line)
     except Exception as e:
         print(f"Erreur de chargement des fichiers JSON: {e}")
         raise dash.exceptions.PreventUpdate
 
-    # Copie profonde pour éviter tout problème de cache
-    fig1 = copy.deepcopy(fig1)
-    fig2 = copy.deepcopy(fig2)
-
-    # Appliquer la mise en forme
-    fig1 = format_figure(fig1, selected_line)
-    fig2 = format_figure(fig2, selected_line)
-
-    # Appliquer le zoom précédent si disponible
-    if store_data and "xaxis" in store_data and store_data["xaxis"]:
-        fig1.update_layout(xaxis_range=store_data["xaxis"])
-        fig2.update_layout(xaxis_range=store_data["xaxis"])  # Ajout explicite
+    # Plage stable après un zoom ou un déplacement (synchronisés dans le navigateur):
+    # seules la plage de l'axe x et les points réduits sont envoyés. Échelle automatique
+    # (plage vide dans le Store): axe x initial et trace réduite sur toute son étendue.
+    if callback_context.triggered_id == "plage-decimation":
+        x_range = store_data.get("xaxis") if store_data else None
+        patch1, patch2 = Patch(), Patch()
+        for patch, fig in ((patch1, fig1), (patch2, fig2)):
+            if x_range:
+                patch["layout"]["xaxis"]["range"] = x_range
+                patch["layout"]["xaxis"]["autorange"] = False
+            else:
+                patch["layout"]["xaxis"] = fig["layout"].get("xaxis", {})
+        for i, (x, y) in points_decimes(fig2, x_range).items():
+            patch2["data"][i]["x"] = x
+            patch2["data"][i]["y"] = y
+        return patch1, patch2
+
+    # Changement de ligne: copies superficielles des figures en cache, sur toute l'étendue
+    # (la plage de l'ancienne ligne n'est pas reprise, le Store est remis à zéro dans le navigateur)
+    # Réduction min-max du profil 25 cm sur toute la trace
+    data2 = list(fig2["data"])
+    for i, (x, y) in points_decimes(fig2).items():
+        data2[i] = dict(data2[i], x=x, y=y)
+    fig2 = dict(fig2, data=data2)
 
     return fig1, fig2
 
 
-# --- Callback pour charger le tableau ---
-@app.callback(
-    Output("data-table", "columns"),
-    Output("data-table", "data"),
-    Input("line-selector", "value")
-)
-def update_table(selected_line):
-    file_map = {
-        "Palézieux - Châtel-St-Denis": "StdE_Palezieux_Chatel_St_Denis.csv",
-        "Châtel-St-Denis - Montbovon": "StdE_Chatel_St_Denis_Montbovon.csv",
-    }
-
-    if selected_line not in file_map:
+def table_affichage(selected_line):
+    """
+    Table StdE d'affichage de la ligne sélectionnée (`table_affichage_stde`), sans mise à
+    jour si la ligne est inconnue ou si le fichier ne peut pas être lu.
+    """
+    if selected_line not in FICHIERS_STDE:
         raise dash.exceptions.PreventUpdate
 
-    file_path = file_map[selected_line]
-
     try:
-        df = pd.read_csv(file_path)
-
+        return table_affichage_stde(selected_line)
     except Exception as e:
         print(f"Erreur de chargement du fichier CSV: {e}")
         raise dash.exceptions.PreventUpdate
 
-    df = df.sort_values(by="annee", ascending=True)
-
-    df["km_start"] = df["km_start"].round(3)
-    df["km_end"] = df["km_end"].round(3)
-    df["reserve_usure_min"] = df["reserve_usure_min"].round(5)
-    df["km_a_meuler"] = df["km_a_meuler"].round(3)
-    df["annee"] = df["annee"].round(1)
-    df["longueur"] = (df["longueur"] * 1000).round(3)
 
-    df = df.iloc[:, [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 12]]
+# --- Callback pour charger le tableau ---
+@app.callback(
+    Output("data-table", "columns"),
+    Output("data-table", "data"),
+    Input("line-selector", "value")
+)
+def update_table(selected_line):
+    df = table_affichage(selected_line)
 
     columns = [{"name": col, "id": col, "deletable": True, "selectable": True} for col in df.columns]
     columns[0]["name"] = "km début"
@@ -504,10 +512,10 @@ def update_table(selected_line):
 @app.callback(
     Output("histogram", "figure"),
     Input("data-table", "selected_columns"),
-    Input("data-table", "data"),
+    Input("line-selector", "value"),
 )
-def update_histogram(col_selected, table_data):
-    df = pd.DataFrame(table_data)
+def update_histogram(col_selected, selected_line):
+    df = table_affichage(selected_line)
 
 
     base_labels = {
@@ -552,51 +560,74 @@ def update_histogram(col_selected, table_data):
 # Graphique linéaire du développement de la réserve d'usure:
 @app.callback(
     Output('usure-graph', 'figure'),
-    Input('data-table', 'data')
+    Input('line-selector', 'value')
 )
-def update_graph(rows):
-    df = pd.DataFrame(rows)
+def update_graph(selected_line):
+    df = table_affichage(selected_line)
     if df.empty:
         return go.Figure()
 
     fig = go.Figure()
     GW = 0.08
-    time_steps = range(11)
-
-    for _, row in df.iterrows():
-        reserve_init = row["reserve_usure_min"]
-        freq = row["frequence"]
-        usure = [reserve_init - GW * freq * t for t in time_steps]
-
-        zero_time = next((t for t in time_steps if usure[t] <= 0), None)
-        color = "darkolivegreen" if zero_time is None or zero_time >= 1 else "papayawhip" if (zero_time > 0 & zero_time < 1) else "firebrick"
-
+    time_steps = np.arange(11)
+
+    # Projection de tous les tronçons en une fois: une ligne par tronçon, une colonne par année
+    reserve_init = df["reserve_usure_min"].to_numpy(dtype=float)
+    freq = df["frequence"].to_numpy(dtype=float)
+    usure = reserve_init[:, None] - GW * np.outer(freq, time_steps)
+
+    # Première année de dépassement (None si la réserve reste positive sur l'horizon)
+    depasse = usure <= 0
+    zero_time = np.where(depasse.any(axis=1), depasse.argmax(axis=1), -1)
+    zero_texte = np.where(zero_time >= 0, zero_time.astype(str), "None")
+
+    texte = ("N° tronçon: " + df["groupe"].astype(str)
+             + "<br> Emplacement km: [" + df["km_start"].astype(str) + "-" + df["km_end"].astype(str)
+             + "]<br>Longueur: " + df["longueur"].astype(str)
+             + " m<br>Réserve initiale: " + df["reserve_usure_min"].astype(str)
+             + " mm<br>Dépassement dans " + zero_texte + " an(s)").to_numpy(dtype=object)
+
+    # Classes de couleur selon la première année de dépassement projetée: réserve déjà
+    # dépassée à l'année 0, sinon pas de dépassement avant la première année
+    classes = [
+        ("firebrick", zero_time == 0),
+        ("darkolivegreen", zero_time != 0),
+    ]
+
+    # Une trace par classe: les tronçons sont séparés par un point NaN
+    nb_pas = len(time_steps)
+    for color, masque in classes:
+        nb = int(masque.sum())
+        if nb == 0:
+            continue
+        x = np.tile(np.append(time_steps, np.nan), nb)
+        y = np.hstack([usure[masque], np.full((nb, 1), np.nan)]).ravel()
+        text = np.repeat(texte[masque], nb_pas + 1)
         fig.add_trace(go.Scatter(
-            x=list(time_steps),
-            y=usure,
+            x=x,
+            y=y,
             mode='lines',
-            name=f'N° tronçon: {row["groupe"]}',
             line=dict(color=color, width=2),
             opacity=0.6,
             hoverinfo='text',
-            text=f"N° tronçon: {row['groupe']}<br> Emplacement km: [{row['km_start']}-{row['km_end']}]<br>Longueur: {row['longueur']} m<br>Réserve initiale: {row['reserve_usure_min']} mm<br>Dépassement dans {zero_time} an(s)"
+            text=text,
         ))
 
-        fig.update_layout(
-            title=dict(text="Évolution temporelle de la réserve d'usure, par tronçon"),
-            title_font_weight="bold",
-            xaxis_title="Temps [années]",
-            yaxis_title="Réserve d'usure [mm]",
-            plot_bgcolor=color_background_div,
-            paper_bgcolor=color_background_div,
-            hovermode="closest",
-            showlegend=False,
-            height=400,
-            margin=dict(l=50, r=50, t=50, b=50),
-            font=dict(family="Verdana", size=12, color="white"),
-            xaxis=dict(showgrid=True, gridcolor="white", showline=True, linewidth=0.5, linecolor='white', mirror=True),
-            yaxis=dict(showgrid=True, gridcolor="white", showline=True, linewidth=0.5, linecolor='white', mirror=True),
-        )
+    fig.update_layout(
+        title=dict(text="Évolution temporelle de la réserve d'usure, par tronçon"),
+        title_font_weight="bold",
+        xaxis_title="Temps [années]",
+        yaxis_title="Réserve d'usure [mm]",
+        plot_bgcolor=color_background_div,
+        paper_bgcolor=color_background_div,
+        hovermode="closest",
+        showlegend=False,
+        height=400,
+        margin=dict(l=50, r=50, t=50, b=50),
+        font=dict(family="Verdana", size=12, color="white"),
+        xaxis=dict(showgrid=True, gridcolor="white", showline=True, linewidth=0.5, linecolor='white', mirror=True),
+        yaxis=dict(showgrid=True, gridcolor="white", showline=True, linewidth=0.5, linecolor='white', mirror=True),
+    )
     return fig
 
 
@@ -608,108 +639,31 @@ def update_graph(rows):
     Input("budget-input", "value")
 )
 def recomm_meulage(line_selector, budget_input):
-    file_map = {
-        "Palézieux - Châtel-St-Denis": "StdE_Palezieux_Chatel_St_Denis.csv",
-        "Châtel-St-Denis - Montbovon": "StdE_Chatel_St_Denis_Montbovon.csv",
-    }
-
-    if line_selector not in file_map:
+    if line_selector not in FICHIERS_STDE:
         raise dash.exceptions.PreventUpdate
 
-    file_path = file_map[line_selector]
-
     try:
-        df = pd.read_csv(file_path)
+        df_fusionne = sections_meulage(line_selector)
     except Exception as e:
         print(f"Erreur de chargement du fichier CSV: {e}")
         raise dash.exceptions.PreventUpdate
 
     if budget_input is None:
         raise dash.exceptions.PreventUpdate
-    km_start_lim = 0
-    budget_max = budget_input  # CHF
-
-    # Étape 1 : Filtrer les tronçons nécessitant un meulage (annee ≤ 1)
-    df_meulage = df[(df["annee"] <= 1) & (df["km_start"] >= km_start_lim)].copy()
-
-    # Ajouter une colonne de longueur + profondeur du tronçon à meuler en km
-    df_meulage["Longueur"] = df_meulage["km_end"] - df_meulage["km_start"]
-    df_meulage["Prof. max. usure [mm]"] = 0.08 - df_meulage["reserve_usure_min"]
-
-    # Trier par priorité de meulage (annee la plus négative en premier)
-    # df_meulage = df_meulage.sort_values(by="annee", ascending=True).reset_index(drop=True)
-    df_meulage = df_meulage.sort_values(by="km_start", ascending=True).reset_index(drop=True)
-
-    # Paramètres
-
-    cout_par_metre = 10  # CHF/m
-    metres_max_km = (budget_max / cout_par_metre) / 1000  # Convertir en km
-    seuil_fusion = 0  # 0.19  # Distance max entre tronçons pour fusionner (en km)
-
-    # Étape 2 : Fusion des tronçons proches en maintenant la priorité sur "annee" min
-    troncons_fusionnes = []
-    troncon_actuel = df_meulage.iloc[0].copy()
-    id_troncons_selectionnes = []
-
-    for i in range(1, len(df_meulage)):
-        km_start, km_end, annee, longueur = df_meulage.loc[i, ["km_start", "km_end", "annee", "Longueur"]]
-
-        # Vérifier si le tronçon est proche du précédent
-        if km_start - troncon_actuel["km_end"] <= seuil_fusion and troncon_actuel["Longueur"] <= 0.85:
-            troncon_actuel["km_end"] = max(troncon_actuel["km_end"], km_end)  # Étendre la fin du tronçon
-            troncon_actuel["Longueur"] = troncon_actuel["km_end"] - troncon_actuel["km_start"]  # Recalculer la longueur
-            troncon_actuel["annee"] = min(troncon_actuel["annee"], annee)  # Prendre la pire année (plus négative)
-
-        else:
-            # Ajouter le tronçon consolidé à la liste et commencer un nouveau
-
-            troncons_fusionnes.append(troncon_actuel)
-            troncon_actuel = df_meulage.iloc[i].copy()
-
-    # Ajouter le dernier tronçon
-    troncons_fusionnes.append(troncon_actuel)
-
-    # Transformer en DataFrame
-    df_fusionne = pd.DataFrame(troncons_fusionnes)
-
-    # Étape 3 : Sélectionner les tronçons en priorisant l'année min
-    df_fusionne = df_fusionne.sort_values(by="annee", ascending=True).reset_index(drop=True)
-    metres_selectionnes_km = 0
-    selection_finale = []
-
-    for i in range(len(df_fusionne)):
-        if metres_selectionnes_km + df_fusionne.loc[i, "Longueur"] <= metres_max_km:
-            selection_finale.append(df_fusionne.loc[i])
-            metres_selectionnes_km += df_fusionne.loc[i, "Longueur"]
-            id_troncons_selectionnes.append(i)
-
-        else:
-            break  # Stopper la sélection si on atteint la limite
-
-    if metres_selectionnes_km < metres_max_km:
-        troncons_non_select = ~df_meulage.index.isin(id_troncons_selectionnes)
-        index_non_selec = [i for i, val in enumerate(troncons_non_select) if val]
-        non_select = df_meulage.iloc[index_non_selec]
-        non_select_reste_km = non_select[non_select["Longueur"] <= (metres_max_km - metres_selectionnes_km)]
-        dernier_troncon_indx = non_select_reste_km["Longueur"].idxmax()
-        selection_finale.append(non_select.loc[dernier_troncon_indx])
-        metres_selectionnes_km += non_select.loc[dernier_troncon_indx, "Longueur"]
-        # print("Il vous reste une réserve de:",
-        #  ((metres_max_km - metres_selectionnes_km) * 1000).round(0), "m.")
-
-    # Transformer en DataFrame final
-    df_selection_corrige = pd.DataFrame(selection_finale)
+
+    # Étape 3 : Sélection optimale des sections sous contrainte de budget (km pondérés par le risque)
+    df_selection_corrige = programme_meulage(df_fusionne, budget_input,
+                                             cout_par_metre=COUT_PAR_METRE,
+                                             cout_mobilisation=COUT_MOBILISATION)
     df_selection_corrige["Longueur"] = (df_selection_corrige["Longueur"] * 1000).round(0)
 
     # Affichage des résultats
-    # print("km totaux selon budget:", metres_max_km)
-    # print("km totaux du programme:", df_selection_corrige["Longueur"].sum().round(3) / 1000, "km")
     df_selection_corrige["km_start"] = df_selection_corrige["km_start"].round(3)
     df_selection_corrige["km_end"] = df_selection_corrige["km_end"].round(3)
     df_selection_corrige["annee"] = df_selection_corrige["annee"].round(1)
     df_selection_corrige["Prof. max. usure [mm]"] = df_selection_corrige["Prof. max. usure [mm]"].round(2)
 
-    df_selection_corrige = df_selection_corrige.iloc[:, [0, 1, 10, 14, 15]]
+    df_selection_corrige = df_selection_corrige[["km_start", "km_end", "annee", "Longueur", "Prof. max. usure [mm]"]]
     columns = [{"name": col, "id": col, "type": "numeric"} for col in df_selection_corrige.columns]
 
     return columns, df_selection_corrige.sort_values("km_start").to_dict("records")
@@ -722,10 +676,10 @@ def recomm_meulage(line_selector, budget_input):
      Output("percent1", "children"),
      Output("percent2", "children"),
      Output("percent3", "children")],
-    [Input("data-table", "data")]
+    [Input("line-selector", "value")]
 )
-def update_info_cards(table_data):
-    df = pd.DataFrame(table_data)
+def update_info_cards(selected_line):
+    df = table_affichage(selected_line)
 
     km_this_year = df[df["annee"] <= 0]["longueur"].sum() / 1000  # en km
     km_next_year = df[(df["annee"] > 0) & (df["annee"] < 1)]["longueur"].sum() / 1000
@@ -1,11 +1,13 @@
-from dash import dcc, html, callback_context, dash_table
+from dash import dcc, html, dash_table
 import plotly.io as pio
 import dash.exceptions
 import copy
 import dash
 import plotly.express as px
-from dash.dependencies import Input, Output, State
-import pandas as pd
+from dash.dependencies import Input, Output, State, ClientsideFunction
+from decimation import decimer_figure
+from donnees_stde import FICHIERS_STDE, table_affichage_stde
+from optimisation_meulage import sections_meulage, programme_meulage, COUT_PAR_METRE, COUT_MOBILISATION
 
 # Color concept
 color_background_div = "#3a3a41"
@@ -202,6 +204,7 @@ sidebar = html.Div(children = [
 main_layout = html.Div([
 
     dcc.Store(id="range-store", data=init_store_data),
+    dcc.Store(id="plage-decimation", data={"xaxis": None}),
 
 
 
@@ -338,8 +341,10 @@ def update_zoom_on_click(active_cell, table_data, current_store):
 
     return new_store
 
-# --- Callback pour sauvegarder le zoom et la ligne sélectionnée ---
-@app.callback(
+# --- Synchronisation du zoom entre les graphes, côté navigateur (assets/synchronisation_axes.js) ---
+# La plage est aussi sauvegardée dans le Store, avec la ligne sélectionnée
+app.clientside_callback(
+    ClientsideFunction(namespace="synchronisation", function_name="synchroniser_axe_x"),
     Output("range-store", "data"),
     Input("graph-1", "relayoutData"),
     Input("graph-2", "relayoutData"),
@@ -347,52 +352,31 @@ def update_zoom_on_click(active_cell, table_data, current_store):
     State("range-store", "data"),
     prevent_initial_call=True
 )
-def update_range(relayout1, relayout2, selected_line, current_store):
-    ctx = callback_context
-    if not ctx.triggered:
-        raise dash.exceptions.PreventUpdate
-
-    triggered_prop = ctx.triggered[0]['prop_id'].split('.')[0]
-    relayout = relayout1 if triggered_prop == "graph-1" else relayout2
-
-    new_store = current_store.copy()
-    updated = False
-
-    if relayout:
-        if "xaxis.range" in relayout:
-            new_range_x = relayout["xaxis.range"]
 
-        elif "xaxis.range[0]" in relayout and "xaxis.range[1]" in relayout:
-            new_range_x = [relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]]
-
-        else:
-            new_range_x = None
-
-        if new_range_x and new_range_x != current_store.get("xaxis"):
-            new_store["xaxis"] = new_range_x
-            updated = True
-
-    if selected_line != current_store.get("selected_line"):
-        new_store["selected_line"] = selected_line
-        updated = True
-
-    if updated:
-        return new_store
-
-    else:
-        raise dash.exceptions.PreventUpdate
+# --- Réduction des points côté serveur, relancée seulement quand la plage est stable ---
+# (zoom et déplacement successifs regroupés dans le navigateur, voir redecimer_plage)
+app.clientside_callback(
+    ClientsideFunction(namespace="synchronisation", function_name="redecimer_plage"),
+    Output("plage-decimation", "data"),
+    Input("range-store", "data"),
+    State("plage-decimation", "data"),
+    prevent_initial_call=True
+)
 
 
 @app.callback(
     Output("graph-1", "figure"),
     Output("graph-2", "figure"),
     Input("line-selector", "value"),
-    Input("range-store", "data"),
+    Input("plage-decimation", "data"),
+    State("range-store", "data"),
 )
-def update_graphs(selected_line, store_data):
+def update_graphs(selected_line, plage_decimation, store_data):
     """
-    Met à jour les figures lorsque l'utilisateur change de ligne
-    et applique le zoom sauvegardé.
+    Met à jour les figures lorsque l'utilisateur change de ligne (toute l'étendue
+    de la nouvelle ligne). Le zoom et le déplacement sont synchronisés dans le
+    navigateur; le serveur n'est appelé que pour réduire les points une fois la plage
+    stable (`plage-decimation`).
     """
     # Dictionnaire pour mapper les noms de lignes aux fichiers JSON
     file_map = {
@@ -423,48 +407,45 @@ def update_graphs(selected_line, store_data):
     fig1 = format_figure(fig1, selected_line)
     fig2 = format_figure(fig2, selected_line)
 
-    # Appliquer le zoom précédent si disponible
-    if store_data and "xaxis" in store_data and store_data["xaxis"]:
-        fig1.update_layout(xaxis_range=store_data["xaxis"])
-        fig2.update_layout(xaxis_range=store_data["xaxis"])  # Ajout explicite
+    # Appliquer le zoom enregistré une fois la plage stable; un changement de ligne
+    # affiche toute l'étendue de la nouvelle ligne (plage de l'ancienne ligne ignorée)
+    x_range = None
+    if dash.ctx.triggered_id == "plage-decimation" and store_data:
+        x_range = store_data.get("xaxis")
+    if x_range:
+        fig1.update_layout(xaxis_range=x_range)
+        fig2.update_layout(xaxis_range=x_range)  # Ajout explicite
+
+    # Réduction min-max du profil 25 cm à la fenêtre visible (pleine résolution une fois
+    # zoomé), sur toute la trace après une échelle automatique ou un changement de ligne
+    fig2 = decimer_figure(fig2, x_range)
 
     return fig1, fig2
 
-# --- Callback pour charger le tableau ---
-@app.callback(
-    Output("data-table", "columns"),
-    Output("data-table", "data"),
-    Input("line-selector", "value")
-)
-def update_table(selected_line):
-    file_map = {
-        "Palézieux - Châtel-St-Denis": "StdE_Palezieux_Chatel_St_Denis.csv",
-        "Châtel-St-Denis - Montbovon": "StdE_Chatel_St_Denis_Montbovon.csv",
-    }
 
-    if selected_line not in file_map:
+def table_affichage(selected_line):
+    """
+    Table StdE d'affichage de la ligne sélectionnée (`table_affichage_stde`), sans mise à
+    jour si la ligne est inconnue ou si le fichier ne peut pas être lu.
+    """
+    if selected_line not in FICHIERS_STDE:
         raise dash.exceptions.PreventUpdate
 
-    file_path = file_map[selected_line]
-
     try:
-        df = pd.read_csv(file_path)
-
+        return table_affichage_stde(selected_line)
     except Exception as e:
         print(f"Erreur de chargement du fichier CSV: {e}")
         raise dash.exceptions.PreventUpdate
 
-    df = df.sort_values(by="annee", ascending=True)
-
 
-    df["km_start"] = df["km_start"].round(3)
-    df["km_end"] = df["km_end"].round(3)
-    df["reserve_usure_min"] = df["reserve_usure_min"].round(5)
-    df["km_a_meuler"] = df["km_a_meuler"].round(3)
-    df["annee"] = df["annee"].round(1)
-    df["longueur"] = (df["longueur"]*1000).round(3)
-
-    df = df.iloc[:, [0,1,2,3,4,5,6,7,8,9,10,12]]
+# --- Callback pour charger le tableau ---
+@app.callback(
+    Output("data-table", "columns"),
+    Output("data-table", "data"),
+    Input("line-selector", "value")
+)
+def update_table(selected_line):
+    df = table_affichage(selected_line)
 
     columns = [{"name": col, "id": col,  "deletable": True, "selectable": True} for col in df.columns]
     columns[0]["name"] = "km début"
@@ -488,10 +469,10 @@ def update_table(selected_line):
 @app.callback(
     Output("histogram", "figure"),
     Input("data-table", "selected_columns"),
-    Input("data-table", "data"),
+    Input("line-selector", "value"),
 )
-def update_histogram(col_selected, table_data):
-    df = pd.DataFrame(table_data)
+def update_histogram(col_selected, selected_line):
+    df = table_affichage(selected_line)
 
     # ✅ Création de l'histogramme avec style blanc
     base_labels = {
@@ -538,109 +519,31 @@ Output("table-meulage", "columns"),
     Input("budget-input", "value")
 )
 def recomm_meulage(line_selector, budget_input):
-    file_map = {
-        "Palézieux - Châtel-St-Denis": "StdE_Palezieux_Chatel_St_Denis.csv",
-        "Châtel-St-Denis - Montbovon": "StdE_Chatel_St_Denis_Montbovon.csv",
-    }
-
-    if line_selector not in file_map:
+    if line_selector not in FICHIERS_STDE:
         raise dash.exceptions.PreventUpdate
 
-    file_path = file_map[line_selector]
-
     try:
-        df = pd.read_csv(file_path)
+        df_fusionne = sections_meulage(line_selector)
     except Exception as e:
         print(f"Erreur de chargement du fichier CSV: {e}")
         raise dash.exceptions.PreventUpdate
 
     if budget_input is None:
         raise dash.exceptions.PreventUpdate
-    km_start_lim = 0
-    budget_max = budget_input # CHF
-
-    # Étape 1 : Filtrer les tronçons nécessitant un meulage (annee ≤ 1)
-    df_meulage = df[(df["annee"] <= 1) & (df["km_start"] >= km_start_lim)].copy()
-
-    # Ajouter une colonne de longueur + profondeur du tronçon à meuler en km
-    df_meulage["Longueur"] = df_meulage["km_end"] - df_meulage["km_start"]
-    df_meulage["Prof. max. usure [mm]"] = 0.08-df_meulage["reserve_usure_min"]
-
-    # Trier par priorité de meulage (annee la plus négative en premier)
-    # df_meulage = df_meulage.sort_values(by="annee", ascending=True).reset_index(drop=True)
-    df_meulage = df_meulage.sort_values(by="km_start", ascending=True).reset_index(drop=True)
-
-    # Paramètres
-
-    cout_par_metre = 10  # CHF/m
-    metres_max_km = (budget_max / cout_par_metre) / 1000  # Convertir en km
-    seuil_fusion = 0 #0.19  # Distance max entre tronçons pour fusionner (en km)
-
-    # Étape 2 : Fusion des tronçons proches en maintenant la priorité sur "annee" min
-    troncons_fusionnes = []
-    troncon_actuel = df_meulage.iloc[0].copy()
-    id_troncons_selectionnes = []
-
-    for i in range(1, len(df_meulage)):
-        km_start, km_end, annee, longueur = df_meulage.loc[i, ["km_start", "km_end", "annee", "Longueur"]]
-
-        # Vérifier si le tronçon est proche du précédent
-        if km_start - troncon_actuel["km_end"] <= seuil_fusion and troncon_actuel["Longueur"] <= 0.85:
-            troncon_actuel["km_end"] = max(troncon_actuel["km_end"], km_end)  # Étendre la fin du tronçon
-            troncon_actuel["Longueur"] = troncon_actuel["km_end"] - troncon_actuel["km_start"]  # Recalculer la longueur
-            troncon_actuel["annee"] = min(troncon_actuel["annee"], annee)  # Prendre la pire année (plus négative)
-
-        else:
-            # Ajouter le tronçon consolidé à la liste et commencer un nouveau
-
-            troncons_fusionnes.append(troncon_actuel)
-            troncon_actuel = df_meulage.iloc[i].copy()
-
-    # Ajouter le dernier tronçon
-    troncons_fusionnes.append(troncon_actuel)
-
-    # Transformer en DataFrame
-    df_fusionne = pd.DataFrame(troncons_fusionnes)
-
-    # Étape 3 : Sélectionner les tronçons en priorisant l'année min
-    df_fusionne = df_fusionne.sort_values(by="annee", ascending=True).reset_index(drop=True)
-    metres_selectionnes_km = 0
-    selection_finale = []
-
-    for i in range(len(df_fusionne)):
-        if metres_selectionnes_km + df_fusionne.loc[i, "Longueur"] <= metres_max_km:
-            selection_finale.append(df_fusionne.loc[i])
-            metres_selectionnes_km += df_fusionne.loc[i, "Longueur"]
-            id_troncons_selectionnes.append(i)
-
-        else:
-            break  # Stopper la sélection si on atteint la limite
-
-    if metres_selectionnes_km < metres_max_km:
-        troncons_non_select = ~df_meulage.index.isin(id_troncons_selectionnes)
-        index_non_selec = [i for i, val in enumerate(troncons_non_select) if val]
-        non_select = df_meulage.iloc[index_non_selec]
-        non_select_reste_km = non_select[non_select["Longueur"] <= (metres_max_km - metres_selectionnes_km)]
-        dernier_troncon_indx = non_select_reste_km["Longueur"].idxmax()
-        selection_finale.append(non_select.loc[dernier_troncon_indx])
-        metres_selectionnes_km += non_select.loc[dernier_troncon_indx, "Longueur"]
-        #print("Il vous reste une réserve de:",
-            #  ((metres_max_km - metres_selectionnes_km) * 1000).round(0), "m.")
-
-    # Transformer en DataFrame final
-    df_selection_corrige = pd.DataFrame(selection_finale)
-    df_selection_corrige["Longueur"] = (df_selection_corrige["Longueur"] * 1000).round(0)
 
+    # Sélection optimale des sections sous contrainte de budget (km pondérés par le risque)
+    df_selection_corrige = programme_meulage(df_fusionne, budget_input,
+                                             cout_par_metre=COUT_PAR_METRE,
+                                             cout_mobilisation=COUT_MOBILISATION)
+    df_selection_corrige["Longueur"] = (df_selection_corrige["Longueur"] * 1000).round(0)
 
     # Affichage des résultats
-    #print("km totaux selon budget:", metres_max_km)
-    #print("km totaux du programme:", df_selection_corrige["Longueur"].sum().round(3) / 1000, "km")
     df_selection_corrige["km_start"] = df_selection_corrige["km_start"].round(3)
     df_selection_corrige["km_end"] = df_selection_corrige["km_end"].round(3)
     df_selection_corrige["annee"] = df_selection_corrige["annee"].round(1)
     df_selection_corrige["Prof. max. usure [mm]"] = df_selection_corrige["Prof. max. usure [mm]"].round(2)
 
-    df_selection_corrige = df_selection_corrige.iloc[:, [0, 1, 10, 14, 15]]
+    df_selection_corrige = df_selection_corrige[["km_start", "km_end", "annee", "Longueur", "Prof. max. usure [mm]"]]
     columns = [{"name": col, "id": col, "type": "numeric"} for col in df_selection_corrige.columns]
 
     return columns, df_selection_corrige.sort_values("km_start").to_dict("records")
@@ -652,10 +555,10 @@ def recomm_meulage(line_selector, budget_input):
      Output("percent1", "children"),
      Output("percent2", "children"),
      Output("percent3", "children")],
-    [Input("data-table", "data")]
+    [Input("line-selector", "value")]
 )
-def update_info_cards(table_data):
-    df = pd.DataFrame(table_data)
+def update_info_cards(selected_line):
+    df = table_affichage(selected_line)
 
     km_this_year = df[df["annee"] <= 0]["longueur"].sum() / 1000  # en km
     km_next_year = df[(df["annee"] > 0) & (df["annee"] < 1)]["longueur"].sum() / 1000
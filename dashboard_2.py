@@ -2,10 +2,10 @@ import dash
 from dash import dcc, html, dash_table, callback_context
 import plotly.io as pio
 import plotly.express as px
-from dash.dependencies import Input, Output, State
+from dash.dependencies import Input, Output, State, ClientsideFunction
 import dash.exceptions
-import pandas as pd
-import copy
+from decimation import decimer_figure
+from donnees_stde import FICHIERS_STDE, table_stde
 
 # Taille des figures et style de la page
 FIGURE_WIDTH = "75vw"
@@ -50,6 +50,7 @@ init_store_data = {
 
 app.layout = html.Div([
     dcc.Store(id="range-store", data=init_store_data),
+    dcc.Store(id="plage-decimation", data={"xaxis": None}),
 
     html.Div([
         html.Label("Sélectionner une ligne ferroviaire:", style={"font-size": "14px"}),
@@ -98,14 +99,37 @@ app.layout = html.Div([
     dcc.Graph(id="histogram", style={'height': "30vh", 'width': TABLE_WIDTH}),
 ], style=PAGE_STYLE)
 
+# --- Synchronisation du zoom entre les graphes, côté navigateur (assets/synchronisation_axes.js) ---
+# La plage est aussi sauvegardée dans le Store, avec la ligne sélectionnée
+app.clientside_callback(
+    ClientsideFunction(namespace="synchronisation", function_name="synchroniser_axe_x"),
+    Output("range-store", "data"),
+    Input("graph-1", "relayoutData"),
+    Input("graph-2", "relayoutData"),
+    Input("line-selector", "value"),
+    State("range-store", "data"),
+    prevent_initial_call=True
+)
+
+# --- Réduction des points côté serveur, relancée seulement quand la plage est stable ---
+# (zoom et déplacement successifs regroupés dans le navigateur, voir redecimer_plage)
+app.clientside_callback(
+    ClientsideFunction(namespace="synchronisation", function_name="redecimer_plage"),
+    Output("plage-decimation", "data"),
+    Input("range-store", "data"),
+    State("plage-decimation", "data"),
+    prevent_initial_call=True
+)
+
 # --- Callback pour charger les graphes à partir des fichiers JSON ---
 @app.callback(
     Output("graph-1", "figure"),
     Output("graph-2", "figure"),
     Input("line-selector", "value"),
-    Input("range-store", "data"),
+    Input("plage-decimation", "data"),
+    State("range-store", "data"),
 )
-def update_graphs(selected_line, store_data):
+def update_graphs(selected_line, plage_decimation, store_data):
     file_map = {
         "Palézieux - Châtel-St-Denis": ("reserve_usure_Palezieux___Chatel_St_Denis.json",
                                         "data_25_cm_Palezieux___Chatel_St_Denis.json"),
@@ -125,9 +149,17 @@ def update_graphs(selected_line, store_data):
         print(f"Erreur de chargement des fichiers JSON: {e}")
         raise dash.exceptions.PreventUpdate
 
-    if store_data and store_data["xaxis"]:
-        fig1.update_layout(xaxis_range=store_data["xaxis"])
-        fig2.update_layout(xaxis_range=store_data["xaxis"])
+    # Zoom enregistré une fois la plage stable; toute l'étendue après un changement de ligne
+    x_range = None
+    if callback_context.triggered_id == "plage-decimation" and store_data:
+        x_range = store_data["xaxis"]
+    if x_range:
+        fig1.update_layout(xaxis_range=x_range)
+        fig2.update_layout(xaxis_range=x_range)
+
+    # Réduction min-max du profil 25 cm à la fenêtre visible (pleine résolution une fois
+    # zoomé), sur toute la trace après une échelle automatique ou un changement de ligne
+    fig2 = decimer_figure(fig2, x_range)
 
     return fig1, fig2
 
@@ -138,18 +170,11 @@ def update_graphs(selected_line, store_data):
     Input("line-selector", "value")
 )
 def update_table(selected_line):
-    file_map = {
-        "Palézieux - Châtel-St-Denis": "StdE_Palezieux_Chatel_St_Denis.csv",
-        "Châtel-St-Denis - Montbovon": "StdE_Chatel_St_Denis_Montbovon.csv",
-    }
-
-    if selected_line not in file_map:
+    if selected_line not in FICHIERS_STDE:
         raise dash.exceptions.PreventUpdate
 
-    file_path = file_map[selected_line]
-
     try:
-        df = pd.read_csv(file_path)
+        df = table_stde(selected_line)
     except Exception as e:
         print(f"Erreur de chargement du fichier CSV: {e}")
         raise dash.exceptions.PreventUpdate
@@ -172,14 +197,17 @@ def update_table(selected_line):
 @app.callback(
     Output("histogram", "figure"),
     Input("data-table", "active_cell"),
-    State("data-table", "data"),
+    State("line-selector", "value"),
 )
-def update_histogram(active_cell, table_data):
+def update_histogram(active_cell, selected_line):
     if not active_cell:
         return px.histogram(title="Sélectionnez une colonne")
+    if selected_line not in FICHIERS_STDE:
+        raise dash.exceptions.PreventUpdate
 
     col_selected = active_cell["column_id"]
-    df = pd.DataFrame(table_data)
+    # Table lue côté serveur (cache partagé), au lieu du contenu du tableau renvoyé par le navigateur
+    df = table_stde(selected_line)
 
     fig = px.histogram(df, x=col_selected, y="longueur", histfunc="sum", title=f"Histogramme de {col_selected}")
     fig.update_layout(bargap=0.1)
@@ -0,0 +1,82 @@
+import numpy as np
+
+NB_POINTS_MAX = 3000  # Points max. envoyés au navigateur par trace
+SEUIL_DECIMATION = 5000  # Les traces plus courtes sont envoyées telles quelles
+
+
+def decimation_min_max(x, y, nb_max=NB_POINTS_MAX, x_range=None, marge=0.5):
+    """
+    Réduit une trace (x, y) à au plus `nb_max` points pour la fenêtre `x_range`,
+    en conservant le minimum et le maximum de chaque paquet de points: les pics
+    (p. ex. au-dessus de la valeur limite) ne sont jamais perdus.
+
+    Les séparateurs NaN (trous de mesure) sont conservés entre les points retenus.
+    Si la fenêtre contient moins de `nb_max` points, les données sont renvoyées
+    en pleine résolution. Si elle ne contient aucun point, toute la trace est réduite.
+
+    :param x_range: [x_min, x_max] visible (None ou hors de la trace = toute la trace)
+    :param marge: Fraction de la largeur de fenêtre ajoutée de chaque côté,
+                  pour que le déplacement latéral reste fluide
+    :return: (x, y) réduits
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    valide = ~(np.isnan(x) | np.isnan(y))
+    dans_fenetre = np.ones(len(x), dtype=bool)
+    if x_range is not None and None not in x_range:
+        x_min, x_max = sorted(float(v) for v in x_range)
+        largeur = x_max - x_min
+        with np.errstate(invalid="ignore"):
+            dans_fenetre = (x >= x_min - marge * largeur) & (x <= x_max + marge * largeur)
+        # Fenêtre hors de l'étendue de la trace (p. ex. plage d'une autre ligne): toute la trace
+        if not (dans_fenetre & valide).any():
+            dans_fenetre = np.ones(len(x), dtype=bool)
+    # Les séparateurs NaN à l'intérieur de la fenêtre sont conservés
+    indices = np.flatnonzero(dans_fenetre)
+    if len(indices) == 0:
+        return x[:0], y[:0]
+    indices = np.arange(indices[0], indices[-1] + 1)
+
+    points = indices[valide[indices] & dans_fenetre[indices]]
+    if len(points) <= nb_max:
+        return x[indices], y[indices]
+
+    # Paquets de taille égale (en nombre de points): min et max de chaque paquet
+    taille = int(np.ceil(len(points) / (nb_max // 2)))
+    nb_paquets = int(np.ceil(len(points) / taille))
+    y_points = np.full(nb_paquets * taille, np.nan)
+    y_points[:len(points)] = y[points]
+    y_points = y_points.reshape(nb_paquets, taille)
+    decalage = np.arange(nb_paquets) * taille
+    i_min = decalage + np.nanargmin(y_points, axis=1)
+    i_max = decalage + np.nanargmax(y_points, axis=1)
+    retenus = points[np.unique(np.concatenate([i_min, i_max]))]
+
+    # Réinsérer un séparateur entre deux points retenus si un trou existait entre eux
+    nb_trous = np.cumsum(np.isnan(x) | np.isnan(y))
+    trous = np.flatnonzero(nb_trous[retenus[1:]] - nb_trous[retenus[:-1]] > 0) + 1
+    return np.insert(x[retenus], trous, np.nan), np.insert(y[retenus], trous, np.nan)
+
+
+def points_decimes(fig, x_range=None, nb_max=NB_POINTS_MAX, seuil=SEUIL_DECIMATION):
+    """
+    Points réduits de chaque trace de la figure de plus de `seuil` points.
+
+    :param fig: Figure plotly ou dictionnaire de figure ({"data": [...], "layout": {...}})
+    :return: Dictionnaire {indice de trace: (x, y)}
+    """
+    traces = fig["data"] if isinstance(fig, dict) else fig.data
+    return {i: decimation_min_max(trace["x"], trace["y"], nb_max=nb_max, x_range=x_range)
+            for i, trace in enumerate(traces)
+            if trace["x"] is not None and trace["y"] is not None and len(trace["x"]) > seuil}
+
+
+def decimer_figure(fig, x_range=None, nb_max=NB_POINTS_MAX, seuil=SEUIL_DECIMATION):
+    """
+    Applique `decimation_min_max` à toutes les traces de la figure de plus de `seuil` points.
+    La figure est modifiée en place et retournée.
+    """
+    for i, (x, y) in points_decimes(fig, x_range, nb_max, seuil).items():
+        fig.data[i].update(x=x, y=y)
+    return fig
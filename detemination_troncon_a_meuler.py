@@ -1,4 +1,5 @@
 import pandas as pd
+from optimisation_meulage import fusion_troncons, programme_meulage, LONGUEUR_MAX_SECTION
 
 # Recharger les données initiales
 file_path = "StdE_Chatel_St_Denis_Montbovon.csv"
@@ -23,64 +24,18 @@ df_meulage = df_meulage.sort_values(by="km_start", ascending=True).reset_index(d
 # Paramètres
 
 cout_par_metre = 10  # CHF/m
+cout_mobilisation = 0  # CHF par chantier
 metres_max_km = (budget_max / cout_par_metre) /1000  # Convertir en km
 seuil_fusion = 0.19  # Distance max entre tronçons pour fusionner (en km)
 
 # Étape 2 : Fusion des tronçons proches en maintenant la priorité sur "annee" min
-troncons_fusionnes = []
-troncon_actuel = df_meulage.iloc[0].copy()
-id_troncons_selectionnes = []
+df_fusionne, _ = fusion_troncons(df_meulage, seuil_fusion, LONGUEUR_MAX_SECTION)
 
-for i in range(1, len(df_meulage)):
-    km_start, km_end, annee, longueur = df_meulage.loc[i, ["km_start", "km_end", "annee", "Longueur"]]
+# Étape 3 : Sélection optimale des sections sous contrainte de budget (km pondérés par le risque)
+df_selection_corrige = programme_meulage(df_fusionne, budget_max, cout_par_metre, cout_mobilisation)
+print("Il vous reste une réserve de:",
+      round((budget_max - df_selection_corrige["cout"].sum()) / cout_par_metre), "m.")
 
-    # Vérifier si le tronçon est proche du précédent
-    if  km_start - troncon_actuel["km_end"] <= seuil_fusion and troncon_actuel["Longueur"] <= 0.85:
-        troncon_actuel["km_end"] = max(troncon_actuel["km_end"], km_end)  # Étendre la fin du tronçon
-        troncon_actuel["Longueur"] = troncon_actuel["km_end"] - troncon_actuel["km_start"]  # Recalculer la longueur
-        troncon_actuel["annee"] = min(troncon_actuel["annee"], annee)  # Prendre la pire année (plus négative)
-
-    else:
-        # Ajouter le tronçon consolidé à la liste et commencer un nouveau
-
-        troncons_fusionnes.append(troncon_actuel)
-        troncon_actuel = df_meulage.iloc[i].copy()
-
-# Ajouter le dernier tronçon
-
-troncons_fusionnes.append(troncon_actuel)
-
-
-# Transformer en DataFrame
-df_fusionne = pd.DataFrame(troncons_fusionnes)
-
-# Étape 3 : Sélectionner les tronçons en priorisant l'année min
-df_fusionne = df_fusionne.sort_values(by="annee", ascending=True).reset_index(drop=True)
-metres_selectionnes_km = 0
-selection_finale = []
-
-for i in range(len(df_fusionne)):
-    if metres_selectionnes_km + df_fusionne.loc[i, "Longueur"] <= metres_max_km:
-        selection_finale.append(df_fusionne.loc[i])
-        metres_selectionnes_km += df_fusionne.loc[i, "Longueur"]
-        id_troncons_selectionnes.append(i)
-
-    else:
-        break  # Stopper la sélection si on atteint la limite
-
-if metres_selectionnes_km < metres_max_km:
-    troncons_non_select = ~df_meulage.index.isin(id_troncons_selectionnes)
-    index_non_selec = [i for i, val in enumerate(troncons_non_select) if val]
-    non_select = df_meulage.iloc[index_non_selec]
-    non_select_reste_km = non_select[non_select["Longueur"]<=(metres_max_km-metres_selectionnes_km)]
-    dernier_troncon_indx = non_select_reste_km["Longueur"].idxmax()
-    selection_finale.append(non_select.loc[dernier_troncon_indx])
-    metres_selectionnes_km += non_select.loc[dernier_troncon_indx, "Longueur"]
-    print("Il vous reste une réserve de:",
-          ((metres_max_km - metres_selectionnes_km)*1000).round(0), "m.")
-
-# Transformer en DataFrame final
-df_selection_corrige = pd.DataFrame(selection_finale)
 df_selection_corrige["Longueur"] = (df_selection_corrige["Longueur"]*1000).round(0)
 
 # Affichage des résultats
@@ -0,0 +1,66 @@
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+# Tables des éléments standards par ligne (produites par attribution_StdE.py)
+FICHIERS_STDE = {
+    "Palézieux - Châtel-St-Denis": "StdE_Palezieux_Chatel_St_Denis.csv",
+    "Châtel-St-Denis - Montbovon": "StdE_Chatel_St_Denis_Montbovon.csv",
+}
+
+# Colonnes texte lues comme catégories, les autres gardent leur type numérique
+TYPES_STDE = {
+    "typ_trav": "category",
+    "typ_rail": "category",
+    "qualite_acier": "category",
+    "bin": "category",
+}
+
+
+def version_stde(ligne):
+    """Version du fichier StdE d'une ligne (date de modification)."""
+    return os.path.getmtime(FICHIERS_STDE[ligne])
+
+
+@lru_cache(maxsize=16)
+def _lire_stde(chemin, version):
+    return pd.read_csv(chemin, dtype=TYPES_STDE)
+
+
+def table_stde(ligne):
+    """
+    Table StdE d'une ligne, lue une seule fois par version du fichier et partagée
+    entre les callbacks. La table en cache ne doit pas être modifiée (utiliser .copy()).
+
+    :raise KeyError: si la ligne est inconnue
+    """
+    chemin = FICHIERS_STDE[ligne]
+    return _lire_stde(chemin, os.path.getmtime(chemin))
+
+
+@lru_cache(maxsize=8)
+def _table_affichage(chemin, version):
+    df = _lire_stde(chemin, version).sort_values(by="annee", ascending=True)
+
+    df["km_start"] = df["km_start"].round(3)
+    df["km_end"] = df["km_end"].round(3)
+    df["reserve_usure_min"] = df["reserve_usure_min"].round(5)
+    df["km_a_meuler"] = df["km_a_meuler"].round(3)
+    df["annee"] = df["annee"].round(1)
+    df["longueur"] = (df["longueur"] * 1000).round(3)
+
+    return df.iloc[:, [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 12]]
+
+
+def table_affichage_stde(ligne):
+    """
+    Table StdE d'une ligne mise en forme pour l'affichage (triée par année, arrondie,
+    longueur en m), calculée une fois par version du fichier. Les callbacks des tableaux
+    de bord la lisent côté serveur au lieu de renvoyer `data-table.data` depuis le
+    navigateur. La table en cache ne doit pas être modifiée.
+
+    :raise KeyError: si la ligne est inconnue
+    """
+    chemin = FICHIERS_STDE[ligne]
+    return _table_affichage(chemin, os.path.getmtime(chemin))
@@ -0,0 +1,97 @@
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+REGLES_PAR_DEFAUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "element_standard_regles.json")
+
+# Position des chiffres C, D, E, F dans le code ABCDEFGH et lettre affichée si inconnu
+POSITIONS = {"C": 5, "D": 4, "E": 3, "F": 2}
+
+
+@lru_cache(maxsize=None)
+def charger_regles(chemin=REGLES_PAR_DEFAUT):
+    """
+    Charge le fichier de règles des éléments standards et précalcule la table dense
+    des fréquences, indexée par les chiffres [C, D, E, F] (0 = valeur inconnue).
+    """
+    with open(chemin, encoding="utf-8") as f:
+        regles = json.load(f)
+
+    # Dimension de chaque axe: plus grand chiffre possible + 1 (0 réservé à l'inconnu)
+    dim_c = max(regles["rayon"]["classes"]) + 1
+    dim_d = max(_valeurs_regle(regles["typ_trav"])) + 1
+    dim_e = max(_valeurs_regle(regles["typ_rail"])) + 1
+    dim_f = max(_valeurs_regle(regles["qualite_acier"])) + 1
+
+    table = np.full((dim_c, dim_d, dim_e, dim_f), regles["frequence_defaut"], dtype=float)
+    for code, frequence in regles["frequence"].items():
+        c, d, e, f = (int(x) for x in code[2:6])
+        table[c, d, e, f] = frequence
+    regles["table_frequence"] = table
+    return regles
+
+
+def _valeurs_regle(regle):
+    valeurs = list(regle.get("egal", {}).values()) + list(regle.get("contient", {}).values())
+    if "defaut" in regle:
+        valeurs.append(regle["defaut"])
+    return valeurs
+
+
+def _chiffre_categoriel(valeurs, regle):
+    """
+    Attribue un chiffre à chaque valeur catégorielle: la règle n'est évaluée qu'une
+    fois par modalité distincte, puis diffusée avec les codes de factorisation.
+    """
+    codes, modalites = pd.factorize(pd.Series(valeurs), use_na_sentinel=True)
+    chiffres_modalites = np.zeros(len(modalites) + 1, dtype=np.int64)  # dernier = NaN
+    for i, modalite in enumerate(modalites):
+        chiffre = regle.get("egal", {}).get(modalite)
+        if chiffre is None:
+            chiffre = next((v for k, v in regle.get("contient", {}).items() if k in str(modalite)),
+                           regle.get("defaut", 0))
+        chiffres_modalites[i] = chiffre
+    return chiffres_modalites[codes]
+
+
+def encoder_element_standard(rayon, typ_trav, typ_rail, qualite_acier, regles=None):
+    """
+    Classifie chaque tronçon et retourne l'élément standard ABCDEFGH.
+
+    :return: (code, code_texte) - code entier à 8 chiffres (0 pour un chiffre inconnu)
+             et sa représentation texte, où les chiffres inconnus sont remplacés par leur lettre
+    """
+    regles = regles or charger_regles()
+
+    # C: classe de rayon par np.digitize (bornes incluses à droite)
+    rayon = np.asarray(rayon, dtype=float)
+    classes = np.asarray(regles["rayon"]["classes"], dtype=np.int64)
+    c = classes[np.digitize(rayon, regles["rayon"]["bornes"], right=True).clip(max=len(classes) - 1)]
+    c[np.isnan(rayon)] = 0
+
+    # D, E, F: correspondance catégorielle
+    d = _chiffre_categoriel(typ_trav, regles["typ_trav"])
+    e = _chiffre_categoriel(typ_rail, regles["typ_rail"])
+    f = _chiffre_categoriel(qualite_acier, regles["qualite_acier"])
+
+    code = (regles["A"] * 10 ** 7 + regles["B"] * 10 ** 6 + c * 10 ** 5 + d * 10 ** 4
+            + e * 10 ** 3 + f * 10 ** 2 + regles["G"] * 10 + regles["H"])
+
+    code_texte = np.array([f"{regles['A']}{regles['B']}"] * len(code), dtype=object)
+    for lettre, chiffre in zip("CDEF", (c, d, e, f)):
+        code_texte = code_texte + np.where(chiffre == 0, lettre, chiffre.astype(str)).astype(object)
+    code_texte = code_texte + f"{regles['G']}{regles['H']}"
+    return code, code_texte
+
+
+def frequence_element_standard(code, regles=None):
+    """
+    Fréquence théorique de meulage [1/an] pour chaque code entier, lue dans la table dense.
+    """
+    regles = regles or charger_regles()
+    code = np.asarray(code, dtype=np.int64)
+    chiffres = [(code // 10 ** POSITIONS[lettre]) % 10 for lettre in "CDEF"]
+    return regles["table_frequence"][tuple(chiffres)]
@@ -0,0 +1,154 @@
+import numpy as np
+
+
+def paires_chevauchement(debut_a, fin_a, debut_b, fin_b, ferme=True):
+    """
+    Jointure par chevauchement entre deux ensembles d'intervalles [debut, fin].
+
+    Les intervalles B sont triés une seule fois par leur début; pour chaque intervalle A,
+    les candidats sont trouvés par recherche dichotomique (searchsorted) puis filtrés,
+    le tout en NumPy, sans boucle Python.
+
+    :param debut_a, fin_a: Bornes des intervalles A (array-like)
+    :param debut_b, fin_b: Bornes des intervalles B (array-like)
+    :param ferme: True pour des intervalles fermés (un point de contact suffit),
+                  False pour exiger un recouvrement strict
+    :return: (idx_a, idx_b, longueur) - indices positionnels des paires qui se chevauchent
+             et longueur du chevauchement, triés par idx_a puis idx_b
+    """
+    debut_a = np.asarray(debut_a, dtype=float)
+    fin_a = np.asarray(fin_a, dtype=float)
+    debut_b = np.asarray(debut_b, dtype=float)
+    fin_b = np.asarray(fin_b, dtype=float)
+
+    vide = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0, dtype=float))
+    valide_b = ~(np.isnan(debut_b) | np.isnan(fin_b))
+    if len(debut_a) == 0 or not valide_b.any():
+        return vide
+
+    # Trier B par début (les intervalles invalides sont écartés)
+    idx_b_valides = np.flatnonzero(valide_b)
+    ordre = idx_b_valides[np.argsort(debut_b[idx_b_valides], kind="stable")]
+    debut_b_tri = debut_b[ordre]
+    longueur_max_b = np.max(fin_b[ordre] - debut_b_tri)
+
+    # Fenêtre de candidats: debut_b dans [debut_a - longueur_max_b, fin_a]
+    bas = np.searchsorted(debut_b_tri, debut_a - longueur_max_b, side="left")
+    haut = np.searchsorted(debut_b_tri, fin_a, side="right")
+    nb = np.where(np.isnan(debut_a) | np.isnan(fin_a), 0, np.maximum(haut - bas, 0))
+    if nb.sum() == 0:
+        return vide
+
+    # Dérouler toutes les fenêtres en une seule passe
+    idx_a = np.repeat(np.arange(len(debut_a)), nb)
+    decalage = np.arange(nb.sum()) - np.repeat(np.cumsum(nb) - nb, nb)
+    idx_b = ordre[np.repeat(bas, nb) + decalage]
+
+    # Conserver les vrais chevauchements
+    if ferme:
+        masque = (debut_b[idx_b] <= fin_a[idx_a]) & (fin_b[idx_b] >= debut_a[idx_a])
+    else:
+        masque = (debut_b[idx_b] < fin_a[idx_a]) & (fin_b[idx_b] > debut_a[idx_a])
+    idx_a, idx_b = idx_a[masque], idx_b[masque]
+
+    tri = np.lexsort((idx_b, idx_a))
+    idx_a, idx_b = idx_a[tri], idx_b[tri]
+    longueur = np.minimum(fin_a[idx_a], fin_b[idx_b]) - np.maximum(debut_a[idx_a], debut_b[idx_b])
+    return idx_a, idx_b, longueur
+
+
+def indice_dominant(idx_a, idx_b, poids, n_a):
+    """
+    Pour chaque intervalle A, retourne l'indice B de poids maximal parmi ses paires
+    (groupby-argmax vectorisé). En cas d'égalité, le premier indice B est retenu.
+
+    :return: Array de taille n_a, -1 si A n'a aucun chevauchement
+    """
+    dominant = np.full(n_a, -1, dtype=np.intp)
+    if len(idx_a) == 0:
+        return dominant
+    tri = np.lexsort((idx_b, -np.asarray(poids, dtype=float), idx_a))
+    groupes, premier = np.unique(idx_a[tri], return_index=True)
+    dominant[groupes] = idx_b[tri][premier]
+    return dominant
+
+
+def intersections_decoupees(debut_a, fin_a, debut_b, fin_b):
+    """
+    Croise deux tables d'intervalles triables par km et retourne les morceaux découpés
+    (recouvrement strict), sous forme de tableaux colonnes.
+
+    :return: (idx_a, idx_b, debut, fin) - pour chaque morceau, les indices positionnels
+             des intervalles d'origine et les bornes de l'intersection
+    """
+    idx_a, idx_b, _ = paires_chevauchement(debut_a, fin_a, debut_b, fin_b, ferme=False)
+    debut_a = np.asarray(debut_a, dtype=float)
+    fin_a = np.asarray(fin_a, dtype=float)
+    debut_b = np.asarray(debut_b, dtype=float)
+    fin_b = np.asarray(fin_b, dtype=float)
+    debut = np.maximum(debut_a[idx_a], debut_b[idx_b])
+    fin = np.minimum(fin_a[idx_a], fin_b[idx_b])
+    return idx_a, idx_b, debut, fin
+
+
+def fusion_intervalles(debut, fin, ecart_max=0.0, longueur_max=np.inf, valeur=None):
+    """
+    Fusionne des intervalles voisins en sections, dans l'ordre des km.
+
+    Un intervalle rejoint la section courante si l'écart avec la fin de la section est
+    au plus `ecart_max` et si la section mesure au plus `longueur_max` avant l'ajout
+    (une section peut donc dépasser `longueur_max` de la longueur d'un intervalle).
+    La fin de la section est le maximum des fins de ses seuls intervalles (les intervalles
+    peuvent se chevaucher). Le maximum cumulé de toutes les fins donne en NumPy des
+    ruptures certaines, qui bornent les sections; chaque section est ensuite délimitée
+    sur cette plage (maximum cumulé de la section), une itération par section.
+
+    :param debut, fin: Bornes des intervalles (array-like, ordre quelconque)
+    :param ecart_max: Écart max. entre deux intervalles d'une même section
+    :param longueur_max: Longueur max. d'une section avant l'ajout d'un intervalle
+    :param valeur: Valeur par intervalle dont on garde le minimum par section (p. ex. annee)
+    :return: (section, debut_f, fin_f, valeur_min) - indice de section de chaque intervalle
+             (ordre d'origine), bornes des sections et minimum de `valeur` (None si non fourni)
+    """
+    debut = np.asarray(debut, dtype=float)
+    fin = np.asarray(fin, dtype=float)
+    n = len(debut)
+    if n == 0:
+        vide = np.empty(0, dtype=float)
+        return np.empty(0, dtype=np.intp), vide, vide, None if valeur is None else vide
+
+    ordre = np.argsort(debut, kind="stable")
+    debut_tri = debut[ordre]
+    fin_tri = fin[ordre]
+    fin_cumulee = np.maximum.accumulate(fin_tri)
+
+    # Ruptures certaines: l'intervalle commence trop loin après la fin de tout ce qui précède
+    # (la fin d'une section ne dépasse jamais ce maximum)
+    rupture = np.ones(n, dtype=bool)
+    rupture[1:] = debut_tri[1:] - fin_cumulee[:-1] > ecart_max
+    ruptures = np.flatnonzero(rupture)
+    fin_groupe = np.append(ruptures, n)[np.searchsorted(ruptures, np.arange(n), side="right")]
+    # Un intervalle de la section commence au plus à debut + longueur_max + ecart_max
+    fin_portee = np.searchsorted(debut_tri, debut_tri + longueur_max + ecart_max, side="right")
+
+    nouvelle = np.zeros(n, dtype=bool)
+    i = 0
+    while i < n:
+        nouvelle[i] = True
+        fin_plage = max(min(fin_groupe[i], fin_portee[i]), i + 1)
+        fin_section = np.maximum.accumulate(fin_tri[i:fin_plage])[:-1]
+        coupure = ((debut_tri[i + 1:fin_plage] - fin_section > ecart_max)
+                   | (fin_section - debut_tri[i] > longueur_max))
+        i = i + 1 + np.argmax(coupure) if coupure.any() else fin_plage
+
+    debuts = np.flatnonzero(nouvelle)
+    section_tri = np.cumsum(nouvelle) - 1
+    section = np.empty(n, dtype=np.intp)
+    section[ordre] = section_tri
+
+    debut_f = debut_tri[debuts]
+    fin_f = np.maximum.reduceat(fin_tri, debuts)
+    valeur_min = None
+    if valeur is not None:
+        valeur_min = np.minimum.reduceat(np.asarray(valeur, dtype=float)[ordre], debuts)
+    return section, debut_f, fin_f, valeur_min
@@ -1,5 +1,7 @@
 import pandas as pd
 import numpy as np
+from intervalles import paires_chevauchement, indice_dominant
+from couches_geo import lire_attributs
 
 def read_csv(file_path):
     df = pd.read_csv(file_path,
@@ -11,7 +13,7 @@ def read_csv(file_path):
     return df
 
 df1 = read_csv('out2.csv')
-df2 = read_csv('segments_avec_km.csv')
+df2 = lire_attributs('segments_avec_km')
 
 df1[['km_debut', 'km_fin']] = df1[['km_debut', 'km_fin']] / 1000
 df2['pk_debut_corr'] = df2[['km_start', 'km_end']].min(axis=1)
@@ -22,33 +24,38 @@ df2['length'] = df2['pk_fin_corr'] - df2['pk_debut_corr']
 
 df2['interval'] = pd.IntervalIndex.from_arrays(df2['pk_debut_corr'],df2['pk_fin_corr'], closed='both')
 
-# Fonction pour trouver les correspondances
-def attribuer_parametres(row, df2):
-    row_interval = pd.Interval(row['km_debut'], row['km_fin'], closed='both')
-    mask = df2['interval'].apply(lambda x: x.overlaps(row_interval))
-    matches = df2[mask]
-
-    if not matches.empty:
-        dominant_traverse = matches.loc[matches['length'].idxmax(), 'typ_trav']
-        dominant_steel = matches.loc[matches['length'].idxmax(), 'qualite_acier']
-        dominant_rail_profil = matches.loc[matches['length'].idxmax(), 'typ_rail']
-        row['traverse'] = dominant_traverse
-        row['acier'] = dominant_steel
-        row['profil_rail'] = dominant_rail_profil
-        row['trav_list'] = list(matches['typ_trav'])  # Liste des paramètres si plusieurs
-        row['acier_list'] =list(matches['qualite_acier'])
-        row['rail_list'] = list(matches['typ_rail'])
-        row['coord1'] = list(matches['interval'])
-        row['left'] = list(matches['interval'].apply(lambda x: x.left))
-
-
-        right = list(matches['interval'].apply(lambda x: x.right))
-
-    else:
-        row['param'] = None  # Aucun recouvrement
-
-    return row
+# Fonction pour trouver les correspondances (jointure vectorisée sur les intervalles)
+def attribuer_parametres(df1, df2):
+    idx_1, idx_2, longueur = paires_chevauchement(df1['km_debut'], df1['km_fin'],
+                                                   df2['pk_debut_corr'], df2['pk_fin_corr'])
+    df1 = df1.copy()
+
+    # Paramètres dominants: tronçon de superstructure avec le plus long recouvrement
+    dominant = indice_dominant(idx_1, idx_2, longueur, len(df1))
+    trouve = dominant >= 0
+    for col_df1, col_df2 in [('traverse', 'typ_trav'), ('acier', 'qualite_acier'), ('profil_rail', 'typ_rail')]:
+        valeurs = np.full(len(df1), np.nan, dtype=object)
+        valeurs[trouve] = df2[col_df2].to_numpy()[dominant[trouve]]
+        df1[col_df1] = valeurs
+
+    # Liste des paramètres si plusieurs
+    paires = pd.DataFrame({
+        'trav_list': df2['typ_trav'].to_numpy()[idx_2],
+        'acier_list': df2['qualite_acier'].to_numpy()[idx_2],
+        'rail_list': df2['typ_rail'].to_numpy()[idx_2],
+        'coord1': df2['interval'].to_numpy()[idx_2],
+        'left': df2['pk_debut_corr'].to_numpy()[idx_2],
+    }, index=df1.index[idx_1])
+    listes = paires.groupby(level=0, sort=False).agg(list)
+    for col in listes.columns:
+        df1[col] = listes[col].reindex(df1.index)
+
+    # Aucun recouvrement: colonne 'param' vide, comme dans la version ligne à ligne
+    if not trouve.all():
+        df1['param'] = None
+
+    return df1
 
 # Appliquer la fonction sur DF1
-df1 = df1.apply(attribuer_parametres, axis=1, args=(df2,))
+df1 = attribuer_parametres(df1, df2)
 df1.to_csv('out3.csv')
\ No newline at end of file
@@ -0,0 +1,182 @@
+from functools import lru_cache
+
+import numpy as np
+
+from donnees_stde import table_stde, version_stde
+from intervalles import fusion_intervalles
+
+COUT_PAR_METRE = 10  # CHF/m de rail meulé
+COUT_MOBILISATION = 0  # CHF par chantier (installation et déplacement de la meuleuse)
+NB_CASES_MAX = 20000  # Résolution max. du budget pour la programmation dynamique
+TAILLE_BLOC_DP = 1024  # Éléments par bloc de reconstruction de la programmation dynamique
+LONGUEUR_MAX_SECTION = 0.85  # km, longueur au-delà de laquelle une section n'est plus prolongée
+GW_MEULAGE = 0.08  # mm, limite d'usure pour la profondeur à meuler
+
+
+def fusion_troncons(df_meulage, seuil_fusion=0.0, longueur_max=LONGUEUR_MAX_SECTION):
+    """
+    Fusionne les tronçons à meuler proches en sections (voir `fusion_intervalles`).
+
+    Chaque section reprend les attributs de son premier tronçon (en km), s'étend jusqu'à
+    la fin la plus lointaine et garde la pire `annee` (la plus petite) de ses tronçons.
+
+    :param df_meulage: DataFrame des tronçons avec 'km_start', 'km_end' et 'annee'
+    :param seuil_fusion: Distance max. entre tronçons pour fusionner [km]
+    :return: (sections, section) - DataFrame des sections avec la colonne 'Longueur' [km],
+             et indice de section de chaque tronçon de `df_meulage`
+    """
+    section, km_start, km_end, annee = fusion_intervalles(
+        df_meulage["km_start"], df_meulage["km_end"],
+        ecart_max=seuil_fusion, longueur_max=longueur_max, valeur=df_meulage["annee"])
+
+    ordre = np.lexsort((df_meulage["km_start"].to_numpy(dtype=float), section))
+    premiers = ordre[np.unique(section[ordre], return_index=True)[1]]
+    sections = df_meulage.iloc[premiers].reset_index(drop=True)
+    sections["km_start"] = km_start
+    sections["km_end"] = km_end
+    sections["annee"] = annee
+    sections["Longueur"] = km_end - km_start
+    return sections, section
+
+
+@lru_cache(maxsize=8)
+def _sections_meulage(ligne, version):
+    df = table_stde(ligne)
+    km_start_lim = 0
+
+    # Étape 1 : Filtrer les tronçons nécessitant un meulage (annee ≤ 1)
+    df_meulage = df[(df["annee"] <= 1) & (df["km_start"] >= km_start_lim)].copy()
+
+    # Ajouter une colonne de longueur + profondeur du tronçon à meuler en km
+    df_meulage["Longueur"] = df_meulage["km_end"] - df_meulage["km_start"]
+    df_meulage["Prof. max. usure [mm]"] = GW_MEULAGE - df_meulage["reserve_usure_min"]
+    df_meulage = df_meulage.sort_values(by="km_start", ascending=True).reset_index(drop=True)
+
+    # Étape 2 : Fusion des tronçons proches en maintenant la priorité sur "annee" min
+    seuil_fusion = 0  # 0.19  # Distance max entre tronçons pour fusionner (en km)
+    df_fusionne, section = fusion_troncons(df_meulage, seuil_fusion, LONGUEUR_MAX_SECTION)
+    df_fusionne["Prof. max. usure [mm]"] = df_meulage.groupby(section)["Prof. max. usure [mm]"].max().to_numpy()
+    return df_fusionne
+
+
+def sections_meulage(ligne):
+    """
+    Tronçons à meuler (annee ≤ 1) d'une ligne fusionnés en sections, avec la profondeur
+    d'usure max. de chaque section. Calculés une fois par version du fichier StdE et
+    partagés par les tableaux de bord: seul l'optimiseur est relancé quand le budget
+    change. Le résultat en cache ne doit pas être modifié.
+
+    :raise KeyError: si la ligne est inconnue
+    """
+    return _sections_meulage(ligne, version_stde(ligne))
+
+
+def poids_risque(annee):
+    """
+    Poids de risque d'un tronçon selon le temps jusqu'au dépassement de la réserve d'usure:
+    1 pour un tronçon à meuler dans l'année (annee = 1), puis +1 par année de retard
+    (annee = 0 -> 2, annee = -2 -> 4). Les tronçons avec plus d'une année de réserve valent 1.
+    """
+    return 1 + np.clip(1 - np.asarray(annee, dtype=float), 0, None)
+
+
+def _ajouter_elements(meilleur, poids, valeurs, pris=None):
+    """
+    Ajoute des éléments à la programmation dynamique (`meilleur` modifié en place). Si
+    `pris` est fourni, la ligne k reçoit les décisions de l'élément k, une capacité par
+    bit (np.packbits).
+    """
+    capacite = len(meilleur) - 1
+    mieux = np.zeros(capacite + 1, dtype=bool)
+    for k, (w, v) in enumerate(zip(poids, valeurs)):
+        avec = meilleur[:capacite + 1 - w] + v
+        mieux[:w] = False
+        mieux[w:] = avec > meilleur[w:]
+        meilleur[w:] = np.where(mieux[w:], avec, meilleur[w:])
+        if pris is not None:
+            pris[k] = np.packbits(mieux)
+
+
+def selection_budget(couts, valeurs, budget, nb_cases_max=NB_CASES_MAX, taille_bloc=TAILLE_BLOC_DP):
+    """
+    Problème du sac à dos 0/1: choisit les éléments qui maximisent la somme des `valeurs`
+    sans que la somme des `couts` dépasse `budget`.
+
+    Résolution exacte par programmation dynamique sur le budget discrétisé (pas de 1 CHF,
+    ou budget / `nb_cases_max` pour les grands budgets). Les coûts sont arrondis au pas
+    supérieur: la sélection ne dépasse jamais le budget. Chaque élément est traité en une
+    opération vectorisée sur toutes les capacités.
+
+    La mémoire reste bornée quel que soit le nombre d'éléments: la table des valeurs est
+    sauvegardée au début de chaque bloc de `taille_bloc` éléments, puis la sélection est
+    reconstruite bloc par bloc en partant du dernier, en recalculant les décisions du bloc
+    (un bit par capacité). Le calcul est fait deux fois au plus.
+
+    :param couts: Coût de chaque élément [CHF]
+    :param valeurs: Valeur de chaque élément (p. ex. km pondérés par le risque)
+    :param budget: Budget disponible [CHF]
+    :return: Masque booléen des éléments retenus
+    """
+    couts = np.asarray(couts, dtype=float)
+    valeurs = np.asarray(valeurs, dtype=float)
+    choix = np.zeros(len(couts), dtype=bool)
+    if budget is None or budget <= 0:
+        return choix
+
+    candidats = np.flatnonzero((couts <= budget) & (valeurs > 0))
+    gratuits = candidats[couts[candidats] <= 0]
+    choix[gratuits] = True
+    candidats = candidats[couts[candidats] > 0]
+    if couts[candidats].sum() <= budget:
+        choix[candidats] = True
+        return choix
+
+    pas = max(1.0, budget / nb_cases_max)
+    capacite = int(budget // pas)
+    poids = np.ceil(couts[candidats] / pas - 1e-9).astype(int)
+    garder = poids <= capacite
+    candidats, poids = candidats[garder], poids[garder]
+
+    valeurs_candidats = valeurs[candidats]
+
+    # meilleur[c]: valeur max. atteignable avec un budget de c pas (sauvegardé par bloc)
+    meilleur = np.zeros(capacite + 1)
+    departs = range(0, len(candidats), taille_bloc)
+    sauvegardes = []
+    for debut in departs:
+        sauvegardes.append(meilleur.copy())
+        _ajouter_elements(meilleur, poids[debut:debut + taille_bloc], valeurs_candidats[debut:debut + taille_bloc])
+
+    # Reconstruction de la sélection en remontant les blocs, puis les éléments de chaque bloc
+    c = capacite
+    pris = np.empty((min(taille_bloc, len(candidats)), (capacite + 8) // 8), dtype=np.uint8)
+    for debut, meilleur in zip(reversed(departs), reversed(sauvegardes)):
+        fin = min(debut + taille_bloc, len(candidats))
+        _ajouter_elements(meilleur, poids[debut:fin], valeurs_candidats[debut:fin], pris)
+        for k in range(fin - debut - 1, -1, -1):
+            if (pris[k, c >> 3] >> (7 - (c & 7))) & 1:
+                choix[candidats[debut + k]] = True
+                c -= poids[debut + k]
+    return choix
+
+
+def programme_meulage(sections, budget, cout_par_metre=COUT_PAR_METRE, cout_mobilisation=COUT_MOBILISATION):
+    """
+    Programme de meulage optimal sous contrainte de budget.
+
+    Chaque section (tronçons fusionnés) coûte sa longueur x `cout_par_metre` plus un coût
+    de mobilisation par chantier; sa valeur est sa longueur pondérée par `poids_risque`.
+    La sélection maximise les km pondérés par le risque sans dépasser le budget.
+
+    :param sections: DataFrame avec au moins les colonnes 'Longueur' [km] et 'annee'
+    :param budget: Budget disponible [CHF]
+    :return: Sections retenues (copie), avec leur coût dans la colonne 'cout'
+    """
+    longueur = sections["Longueur"].to_numpy(dtype=float)
+    couts = longueur * 1000 * cout_par_metre + cout_mobilisation
+    valeurs = longueur * poids_risque(sections["annee"].to_numpy(dtype=float))
+
+    choix = selection_budget(couts, valeurs, budget)
+    selection = sections[choix].copy()
+    selection["cout"] = couts[choix]
+    return selection
@@ -0,0 +1,209 @@
+import os
+import re
+import shutil
+
+import pandas as pd
+pd.options.mode.chained_assignment = None  # default='warn'
+import numpy as np
+
+NA_VALUES = ["N/A", "NA", "-", " "]
+COL_RAYON = 'Nom_Infrastructure_Horizontal geometry'
+COL_ATM = ['ATM Riffel 10-30 l', 'ATM Riffel 30-100 l', 'ATM Riffel 100-300 l', 'ATM Riffel 300-1000 l',
+           'ATM Riffel 10-30 r', 'ATM Riffel 30-100 r', 'ATM Riffel 100-300 r', 'ATM Riffel 300-1000 r']
+COL_CAL = ['CAL Riffel 10-100 l', 'CAL Riffel 30-300 l', 'CAL Riffel 10-100 r', 'CAL Riffel 30-300 r']
+# Colonnes du rapport de la voiture de mesure utilisées par les analyses
+COLONNES_UTILES = ['Linie', 'von', 'bis', COL_RAYON] + COL_ATM
+DOSSIER_CACHE = "cache_rapports"
+# Marqueur de conversion complète; nouveau nom à chaque changement de format du cache
+# (v2: colonnes Riffel en float64), pour reconstruire les caches existants
+MARQUEUR_CACHE = "_complet-v2"
+
+
+# Fonction pour transformer les nombres rationnels des rayons
+def transformer_rationnels(x):
+    if isinstance(x, (int, float)) and x != 0:
+        # Vérifie si le nombre est rationnel sous forme décimale périodique
+        if -1 < x < 1 and not np.isinf(1/x):
+            return round(abs(1 / x))
+    return x  # Garde les autres nombres inchangés
+
+
+def transformer_rationnels_serie(serie):
+    """
+    Version vectorisée de `transformer_rationnels` sur une colonne entière: les courbures
+    dans ]-1, 1[ sont converties en rayon absolu arrondi; 0, NaN et les autres valeurs
+    sont conservés tels quels.
+    """
+    if not pd.api.types.is_numeric_dtype(serie):
+        return serie.apply(transformer_rationnels)
+
+    valeurs = serie.to_numpy(dtype=float)
+    with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+        inverse = 1 / valeurs
+        # NaN échoue aux comparaisons; 0 et les valeurs infimes donnent un inverse infini
+        masque = (valeurs > -1) & (valeurs < 1) & np.isfinite(inverse)
+    return pd.Series(np.where(masque, np.round(np.abs(inverse)), valeurs), index=serie.index, name=serie.name)
+
+
+def ajouter_riffel_cal(df):
+    """Ajoute les sommes CAL Riffel (10-100 et 30-300 mm) pour les deux rails."""
+    df['CAL Riffel 10-100 l'] = df['ATM Riffel 10-30 l'] + df['ATM Riffel 30-100 l']
+    df['CAL Riffel 30-300 l'] = df['ATM Riffel 30-100 l'] + df['ATM Riffel 100-300 l']
+    df['CAL Riffel 10-100 r'] = df['ATM Riffel 10-30 r'] + df['ATM Riffel 30-100 r']
+    df['CAL Riffel 30-300 r'] = df['ATM Riffel 30-100 r'] + df['ATM Riffel 100-300 r']
+    return df
+
+
+def _morceaux_rapport(file_path, taille_morceau, colonnes):
+    """Générateur des morceaux nettoyés du rapport (rayons transformés, sommes CAL)."""
+    lecteur = pd.read_csv(file_path,
+        na_values=NA_VALUES,
+        usecols=colonnes,
+        chunksize=taille_morceau,
+        encoding='latin-1'
+    )
+    for morceau in lecteur:
+        morceau[COL_RAYON] = transformer_rationnels_serie(morceau[COL_RAYON])
+        yield ajouter_riffel_cal(morceau)
+
+
+def date_campagne(file_path):
+    """Date de la campagne de mesure extraite du nom du rapport (ex. report2025-01-08_13-28.csv)."""
+    date = re.search(r"\d{4}-\d{2}-\d{2}", os.path.basename(file_path))
+    return date.group(0) if date else "inconnue"
+
+
+def convertir_rapport_parquet(file_path, dossier_cache=DOSSIER_CACHE, taille_morceau=500_000):
+    """
+    Convertit le rapport CSV en un jeu de données Parquet partitionné par campagne et par ligne.
+
+    Le rapport est lu en flux par morceaux de `taille_morceau` lignes (mémoire de travail
+    bornée par la taille d'un morceau); chaque morceau nettoyé (rayons transformés, sommes
+    CAL Riffel) est écrit directement dans les partitions `campagne=.../Linie=...`.
+    Les colonnes Riffel restent en float64: `fun_groupe` donne exactement le même résultat
+    que sur le rapport lu en entier.
+    """
+    campagne = date_campagne(file_path)
+    dossier_campagne = os.path.join(dossier_cache, f"campagne={campagne}")
+    if os.path.exists(dossier_campagne):
+        shutil.rmtree(dossier_campagne)
+
+    for i, morceau in enumerate(_morceaux_rapport(file_path, taille_morceau, COLONNES_UTILES)):
+        morceau["campagne"] = campagne
+        morceau.to_parquet(dossier_cache, partition_cols=["campagne", "Linie"], index=False,
+                           basename_template=f"morceau-{i:05d}-{{i}}.parquet")
+
+    # Marqueur de conversion complète (ignoré par la lecture Parquet)
+    os.makedirs(dossier_campagne, exist_ok=True)
+    open(os.path.join(dossier_campagne, MARQUEUR_CACHE), "w").close()
+    return dossier_campagne
+
+
+def lire_rapport_parquet(dossier_cache=DOSSIER_CACHE, campagne=None, lignes=None, colonnes=None):
+    """
+    Lit le cache Parquet en ne chargeant que les colonnes demandées (fichiers mappés en mémoire).
+
+    :param campagne: Date de campagne à lire (None = toutes)
+    :param lignes: Liste des lignes à lire (None = toutes)
+    :param colonnes: Colonnes à lire, en plus de `Linie` (None = toutes)
+    """
+    filtres = []
+    if campagne is not None:
+        filtres.append(("campagne", "==", campagne))
+    if lignes is not None:
+        filtres.append(("Linie", "in", list(lignes)))
+    if colonnes is not None:
+        colonnes = ['Linie'] + [c for c in colonnes if c != 'Linie']
+
+    # Les fichiers "morceau-NNNNN" sont lus dans l'ordre du rapport d'origine
+    return pd.read_parquet(dossier_cache, columns=colonnes, filters=filtres or None, memory_map=True)
+
+
+def charger_rapport(file_path, dossier_cache=DOSSIER_CACHE, lignes=None, colonnes=None):
+    """
+    Retourne le rapport nettoyé depuis le cache Parquet, en le (re)construisant
+    si le CSV est plus récent que le cache.
+    """
+    campagne = date_campagne(file_path)
+    marqueur = os.path.join(dossier_cache, f"campagne={campagne}", MARQUEUR_CACHE)
+    if not os.path.exists(marqueur) or os.path.getmtime(marqueur) < os.path.getmtime(file_path):
+        convertir_rapport_parquet(file_path, dossier_cache)
+    return lire_rapport_parquet(dossier_cache, campagne=campagne, lignes=lignes, colonnes=colonnes)
+
+
+def table_courbes(df_ligne):
+    """
+    Encodage par plages (run-length) des rayons d'une ligne: une entrée par suite continue
+    de mesures de même rayon, calculée une seule fois sur toute la ligne.
+
+    :return: DataFrame (debut, fin, km_debut, km_fin, rayon) où debut/fin sont les positions
+             (fin exclue) des mesures de la plage dans `df_ligne`
+    """
+    rayon = df_ligne[COL_RAYON].to_numpy(dtype=float)
+    n = len(rayon)
+    if n == 0:
+        return pd.DataFrame({'debut': [], 'fin': [], 'km_debut': [], 'km_fin': [], 'rayon': []})
+
+    changement = np.empty(n, dtype=bool)
+    changement[0] = True
+    changement[1:] = rayon[1:] != rayon[:-1]
+    debut = np.flatnonzero(changement)
+    fin = np.append(debut[1:], n)
+    return pd.DataFrame({
+        'debut': debut,
+        'fin': fin,
+        'km_debut': np.fmin.reduceat(df_ligne['von'].to_numpy(dtype=float), debut),
+        'km_fin': np.fmax.reduceat(df_ligne['bis'].to_numpy(dtype=float), debut),
+        'rayon': rayon[debut],
+    })
+
+
+def filtrer_courbes(courbes, r_min, r_max):
+    """
+    Restreint la table des courbes à une plage de rayons. Les plages conservées qui
+    deviennent voisines avec le même rayon sont regroupées dans un même `groupe`,
+    comme lors d'un filtrage préalable des mesures.
+    """
+    courbes = courbes[(courbes['rayon'] >= r_min) & (courbes['rayon'] <= r_max)].copy()
+    rayon = courbes['rayon'].to_numpy()
+    nouveau = np.ones(len(rayon), dtype=bool)
+    nouveau[1:] = rayon[1:] != rayon[:-1]
+    groupe = np.cumsum(nouveau)
+    courbes['groupe'] = groupe
+    if len(courbes):
+        debuts = np.flatnonzero(nouveau)
+        nb = np.diff(np.append(debuts, len(rayon)))
+        courbes['km_debut_groupe'] = np.repeat(np.fmin.reduceat(courbes['km_debut'].to_numpy(), debuts), nb)
+        courbes['km_fin_groupe'] = np.repeat(np.fmax.reduceat(courbes['km_fin'].to_numpy(), debuts), nb)
+    else:
+        courbes['km_debut_groupe'] = courbes['km_debut']
+        courbes['km_fin_groupe'] = courbes['km_fin']
+    return courbes
+
+
+def fun_groupe(df,ligne,r_min, r_max, courbes=None):
+    """
+    Mesures d'une ligne dont le rayon est dans [r_min, r_max], avec leur groupe (courbe),
+    les km de début/fin de la courbe et son rayon.
+
+    :param courbes: Table des courbes de la ligne (`table_courbes`), à passer si la fonction
+                    est appelée plusieurs fois sur la même ligne
+    """
+    df_ligne = df if (df['Linie'] == ligne).all() else df[df['Linie'] == ligne]
+    if courbes is None:
+        courbes = table_courbes(df_ligne)
+    courbes = filtrer_courbes(courbes, r_min, r_max)
+
+    # Positions des mesures des plages conservées, et diffusion des attributs de courbe
+    nb = (courbes['fin'] - courbes['debut']).to_numpy()
+    positions = (np.repeat(courbes['debut'].to_numpy() - np.cumsum(nb) + nb, nb) + np.arange(nb.sum())).astype(np.intp)
+    df_filtre = df_ligne.iloc[positions].copy()
+
+    df_filtre['groupe'] = np.repeat(courbes['groupe'].to_numpy(), nb)
+    df_filtre = ajouter_riffel_cal(df_filtre)
+    df_filtre['km_debut'] = np.repeat(courbes['km_debut_groupe'].to_numpy(), nb)
+    df_filtre['km_fin'] = np.repeat(courbes['km_fin_groupe'].to_numpy(), nb)
+    df_filtre['rayon_courbe'] = np.repeat(courbes['rayon'].to_numpy(), nb)
+    df_filtre["long"] = df_filtre["bis"]-df_filtre["von"]
+    #df_filtre = df_filtre.sort_values(by='von')
+    return df_filtre
@@ -0,0 +1,245 @@
+import os
+import unicodedata
+from functools import lru_cache
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.ops import linemerge
+
+from couches_geo import ajouter_simplifications, TOLERANCES_SIMPLIFICATION
+from reperage_km import axes_voie, decouper_lignes, TOLERANCE_AXE
+
+SOURCE_VOIE = "20250128-etat-voie.geojson"
+SOURCE_POINTS_KM = "points_km.geojson"
+FICHIER_REGISTRE = "registre_voies.parquet"
+CRS_VOIE = "EPSG:2056"
+COS_REBROUSSEMENT = -0.5  # Angle de plus de 120° entre deux arêtes: la ligne repart en arrière
+# Lignes mesurées: code de ligne de l'état de la voie -> (nom de la ligne (Linie), préfixe des Gleispunkte)
+LIGNES = {
+    "PC": ("Palézieux - Châtel-St-Denis", "02-117-01"),
+    "CM": ("Châtel-St-Denis - Montbovon", "02-118-01"),
+}
+
+
+def sans_rebroussements(coordonnees, cos_max=COS_REBROUSSEMENT):
+    """
+    Retire les sommets où la ligne repart en arrière (aller-retour laissé par `linemerge`
+    sur un segment saisi à l'envers, raccord entre deux tronçons), jusqu'à ce qu'il n'y
+    en ait plus.
+
+    :param coordonnees: Coordonnées (n, 2) de la ligne
+    :param cos_max: Cosinus de l'angle entre deux arêtes successives en dessous duquel le
+                    sommet commun est retiré
+    """
+    while True:
+        # Sommets confondus (raccords, aller-retour exact) retirés avant le calcul des angles
+        garder = np.ones(len(coordonnees), dtype=bool)
+        garder[1:] = (np.diff(coordonnees, axis=0) != 0).any(axis=1)
+        coordonnees = coordonnees[garder]
+        if len(coordonnees) <= 2:
+            break
+        aretes = np.diff(coordonnees, axis=0)
+        normes = np.linalg.norm(aretes, axis=1)
+        cos = np.einsum("ij,ij->i", aretes[:-1], aretes[1:]) / (normes[:-1] * normes[1:])
+        retour = np.flatnonzero(cos < cos_max) + 1
+        if len(retour) == 0:
+            break
+        # Pas deux sommets voisins dans la même passe: les angles sont recalculés ensuite
+        retour = retour[np.insert(np.diff(retour) > 1, 0, True)]
+        coordonnees = np.delete(coordonnees, retour, axis=0)
+    return coordonnees
+
+
+def axe_etalonne(geometries, points, km, tolerance=TOLERANCE_AXE):
+    """
+    Axe continu d'une ligne construit avec la géométrie réelle de la voie, étalonné par
+    les points kilométriques.
+
+    Les segments sont fusionnés en tronçons continus (`axes_voie`); chaque point km est
+    projeté sur le tronçon le plus proche (à moins de `tolerance`). Les tronçons portant au
+    moins deux points km sont orientés dans le sens des km et mis bout à bout dans l'ordre
+    des km; les tronçons dont les km sont déjà couverts (voies parallèles, évitements) et
+    ceux sans points km sont écartés, ainsi que les allers-retours aux raccords
+    (`sans_rebroussements`). Les points km sont ensuite projetés sur l'axe obtenu:
+    les paires (km, chaînage) croissantes servent d'étalonnage.
+
+    :param geometries: Géométries des segments de voie de la ligne (CRS métrique)
+    :param points: Points kilométriques de la ligne (array-like de Points)
+    :param km: Valeur kilométrique de chaque point
+    :return: (axe, km_etalonnage, chainage_etalonnage) - LineString et paires d'étalonnage
+             triées, ou (None, None, None) si aucun tronçon ne porte deux points km
+    """
+    troncons = axes_voie(geometries)
+    points = np.asarray(points)
+    km = np.asarray(km, dtype=float)
+    (i_point, i_troncon), distance = shapely.STRtree(troncons).query_nearest(points, return_distance=True,
+                                                                            all_matches=False)
+    garder = distance <= tolerance
+    i_point, i_troncon = i_point[garder], i_troncon[garder]
+    position = shapely.line_locate_point(troncons[i_troncon], points[i_point])
+
+    # Étendue des km et sens de chaque tronçon (km croissants ou décroissants le long du tronçon)
+    etendues = []
+    for t in np.unique(i_troncon):
+        masque = i_troncon == t
+        if masque.sum() < 2:
+            continue
+        km_t, position_t = km[i_point[masque]], position[masque]
+        sens = np.sign(np.polyfit(position_t, km_t, 1)[0]) if np.ptp(position_t) > 0 else 0
+        if sens != 0:
+            etendues.append((km_t.min(), km_t.max(), t, sens))
+    if not etendues:
+        return None, None, None
+
+    # Tronçons mis bout à bout dans l'ordre des km, sans revenir sur les km déjà couverts
+    coordonnees, km_couvert = [], -np.inf
+    for km_min, km_max, t, sens in sorted(etendues):
+        if km_max <= km_couvert:
+            continue
+        xy = shapely.get_coordinates(troncons[t])
+        coordonnees.append(xy if sens > 0 else xy[::-1])
+        km_couvert = km_max
+    axe = shapely.LineString(sans_rebroussements(np.concatenate(coordonnees)))
+
+    # Étalonnage: km et chaînage des points km proches de l'axe, croissants ensemble
+    proche = shapely.distance(axe, points) <= tolerance
+    ordre = np.argsort(km[proche], kind="stable")
+    km_etalonnage = km[proche][ordre]
+    chainage = shapely.line_locate_point(axe, points[proche][ordre])
+    croissant = np.ones(len(chainage), dtype=bool)
+    croissant[1:] = (chainage[1:] > np.maximum.accumulate(chainage)[:-1]) & (np.diff(km_etalonnage) > 0)
+    return axe, km_etalonnage[croissant], chainage[croissant]
+
+
+def construire_registre(source_voie=SOURCE_VOIE, source_points_km=SOURCE_POINTS_KM, fichier=FICHIER_REGISTRE):
+    """
+    Construit le registre des géométries de voie: un axe par ligne en EPSG:2056, avec
+    son km d'origine, son km de fin et son étalonnage km -> chaînage, enregistré en
+    GeoParquet avec ses versions simplifiées (`TOLERANCES_SIMPLIFICATION`) pour l'affichage.
+
+    Pour les lignes qui ont des points kilométriques (Gleispunkte), l'axe suit la géométrie
+    réelle des segments de l'état de la voie et les points km servent seulement à
+    l'étalonner (`axe_etalonne`). Pour les autres lignes, l'axe est la fusion (`linemerge`)
+    des segments, sans km.
+
+    :return: GeoDataFrame (ligne, nom, km_origine, km_fin, etalonnage_km, etalonnage_chainage,
+             geometry, geometry_dp<tolérance>)
+    """
+    voie = gpd.read_file(source_voie).to_crs(CRS_VOIE)
+    points_km = gpd.read_file(source_points_km).to_crs(CRS_VOIE)
+    gleispunkt = points_km["name"].str.split(": ").str[1]
+    prefixe_point = gleispunkt.str.rsplit("-", n=1).str[0]
+    km_point = gleispunkt.str.rsplit("-", n=1).str[1].astype(float).to_numpy()
+
+    lignes, noms, km_origine, km_fin, axes = [], [], [], [], []
+    etalonnage_km, etalonnage_chainage = [], []
+    for code, segments in voie.groupby("ligne"):
+        nom, prefixe = LIGNES.get(code, (code, None))
+        masque = (prefixe_point == prefixe).to_numpy()
+        axe, km, chainage = None, None, None
+        if masque.sum() >= 2:
+            axe, km, chainage = axe_etalonne(segments.geometry.values, points_km.geometry.values[masque],
+                                             km_point[masque])
+        if axe is None or len(km) < 2:
+            axe = linemerge(shapely.get_parts(segments.geometry.values).tolist())
+            km, chainage = np.empty(0), np.empty(0)
+        lignes.append(code)
+        noms.append(nom)
+        km_origine.append(km[0] if len(km) else np.nan)
+        km_fin.append(km[-1] if len(km) else np.nan)
+        etalonnage_km.append(km)
+        etalonnage_chainage.append(chainage)
+        axes.append(axe)
+
+    registre = gpd.GeoDataFrame({"ligne": lignes, "nom": noms, "km_origine": km_origine, "km_fin": km_fin,
+                                 "etalonnage_km": etalonnage_km, "etalonnage_chainage": etalonnage_chainage},
+                                geometry=axes, crs=CRS_VOIE)
+    registre = ajouter_simplifications(registre, TOLERANCES_SIMPLIFICATION)
+    registre.to_parquet(fichier, index=False)
+    return registre
+
+
+@lru_cache(maxsize=4)
+def _lire_registre(fichier, version):
+    return gpd.read_parquet(fichier)
+
+
+def registre_voies(fichier=FICHIER_REGISTRE, source_voie=SOURCE_VOIE, source_points_km=SOURCE_POINTS_KM):
+    """
+    Registre des axes de voie, lu une seule fois par version du fichier GeoParquet et
+    reconstruit si les sources sont plus récentes. Le registre en cache ne doit pas être
+    modifié (utiliser .copy()).
+    """
+    if not os.path.exists(fichier) or os.path.getmtime(fichier) < max(os.path.getmtime(source_voie),
+                                                                       os.path.getmtime(source_points_km)):
+        construire_registre(source_voie, source_points_km, fichier)
+    return _lire_registre(fichier, os.path.getmtime(fichier))
+
+
+def _normaliser_nom(nom):
+    """Nom de ligne sans accents ni casse ("Palezieux - Chatel-St-Denis" == "Palézieux - Châtel-St-Denis")."""
+    decompose = unicodedata.normalize("NFKD", str(nom))
+    return "".join(c for c in decompose if not unicodedata.combining(c)).casefold().strip()
+
+
+def axe_ligne(ligne, registre=None):
+    """
+    Entrée du registre pour une ligne, désignée par son code (p. ex. "PC") ou son nom (Linie,
+    avec ou sans accents).
+
+    :raise KeyError: si la ligne est inconnue
+    """
+    if registre is None:
+        registre = registre_voies()
+    noms = registre["nom"].map(_normaliser_nom)
+    entree = registre[(registre["ligne"] == ligne) | (noms == _normaliser_nom(ligne))]
+    if entree.empty:
+        raise KeyError(ligne)
+    return entree.iloc[0]
+
+
+def chainage_km(axe, km):
+    """
+    Chaînage le long de l'axe [m] des points kilométriques `km` (axe du registre avec km),
+    interpolé entre les points d'étalonnage (limité aux extrémités étalonnées).
+    """
+    return np.interp(np.asarray(km, dtype=float), np.asarray(axe["etalonnage_km"], dtype=float),
+                     np.asarray(axe["etalonnage_chainage"], dtype=float))
+
+
+def troncons_km(ligne, km_debut, km_fin, registre=None):
+    """
+    Géométries des tronçons [km_debut, km_fin] d'une ligne, découpées en une fois le long
+    de l'axe du registre (EPSG:2056).
+
+    :return: Tableau de MultiLineStrings (vide si le tronçon est hors de l'axe)
+    """
+    axe = axe_ligne(ligne, registre)
+    if np.isnan(axe["km_origine"]):
+        raise ValueError(f"Pas de kilométrage pour la ligne {ligne}")
+    km_debut = np.asarray(km_debut, dtype=float)
+    return decouper_lignes([axe.geometry], np.zeros(len(km_debut), dtype=np.intp),
+                           chainage_km(axe, km_debut), chainage_km(axe, km_fin))
+
+
+def troncons_lignes(lignes, km_debut, km_fin, registre=None):
+    """
+    Géométries des tronçons [km_debut, km_fin] de plusieurs lignes: chaque tronçon est
+    découpé sur l'axe de sa propre ligne (`troncons_km`, un appel par ligne).
+
+    :param lignes: Ligne de chaque tronçon (code ou nom, voir `axe_ligne`)
+    :return: Tableau de MultiLineStrings, dans l'ordre des tronçons
+    :raise KeyError: si une ligne est inconnue
+    """
+    if registre is None:
+        registre = registre_voies()
+    km_debut = np.asarray(km_debut, dtype=float)
+    km_fin = np.asarray(km_fin, dtype=float)
+    code, noms = pd.factorize(np.asarray(lignes, dtype=object))
+    geometries = np.empty(len(km_debut), dtype=object)
+    for i, ligne in enumerate(noms):
+        masque = code == i
+        geometries[masque] = troncons_km(ligne, km_debut[masque], km_fin[masque], registre)
+    return geometries
@@ -0,0 +1,259 @@
+import numpy as np
+import shapely
+from scipy.spatial import cKDTree
+from shapely.ops import linemerge
+
+TOLERANCE_AXE = 30.0  # m, distance max. entre un point km et l'axe de voie pour l'étalonnage
+TOLERANCE_SAUT = 0.2  # Écart relatif max. entre chaînage et km de deux points km voisins
+
+
+def index_points_km(points_km):
+    """
+    Index spatial (k-d tree) des points kilométriques, construit une seule fois.
+
+    :param points_km: GeoDataFrame des points kilométriques (CRS métrique)
+    :return: cKDTree sur les coordonnées (x, y) des points
+    """
+    return cKDTree(shapely.get_coordinates(points_km.geometry.values))
+
+
+def km_plus_proches(points_km, points, colonne="km_extrait", index=None):
+    """
+    Point kilométrique le plus proche de chaque point, en une seule requête groupée.
+
+    :param points_km: GeoDataFrame des points kilométriques
+    :param points: Géométries ponctuelles (array-like de Points) ou coordonnées (n, 2)
+    :param colonne: Colonne de `points_km` contenant la valeur kilométrique
+    :param index: Index déjà construit avec `index_points_km` (None = construit ici)
+    :return: (km, distance) - valeur de `colonne` et distance au point km le plus proche
+    """
+    if index is None:
+        index = index_points_km(points_km)
+    points = np.asarray(points)
+    coordonnees = points if points.dtype.kind == "f" else shapely.get_coordinates(points)
+    distance, plus_proche = index.query(coordonnees[:, :2])
+    return points_km[colonne].to_numpy()[plus_proche], distance
+
+
+def extremites(geometries):
+    """
+    Premier point de la première ligne et dernier point de la dernière ligne de chaque
+    géométrie (LineString ou MultiLineString), sans boucle Python.
+
+    :return: (debut, fin) - tableaux de Points
+    """
+    geometries = np.asarray(geometries)
+    debut = shapely.get_point(shapely.get_geometry(geometries, 0), 0)
+    fin = shapely.get_point(shapely.get_geometry(geometries, -1), -1)
+    return debut, fin
+
+
+def axes_voie(geometries):
+    """
+    Fusionne une seule fois les segments de voie en axes continus (`linemerge`).
+
+    :return: Tableau de LineStrings (un par tronçon continu de l'axe)
+    """
+    parties = shapely.get_parts(np.asarray(geometries))
+    return shapely.get_parts(linemerge(parties.tolist()))
+
+
+def referentiel_lineaire(geometries, points_km, colonne="km_extrait", tolerance=TOLERANCE_AXE):
+    """
+    Référentiel linéaire de la voie: axes fusionnés et chaînage des points kilométriques
+    le long de ces axes.
+
+    Chaque point km est rattaché à l'axe le plus proche (s'il est à moins de `tolerance`)
+    et projeté dessus (`line_locate_point`). Les chaînages de tous les axes sont mis bout
+    à bout, décalés de la longueur des axes précédents, dans un seul tableau trié: une
+    recherche dichotomique suffit ensuite pour interpoler n'importe quel lot de points.
+
+    :param geometries: Géométries des segments de voie (CRS métrique)
+    :param points_km: GeoDataFrame des points kilométriques (même CRS)
+    :param colonne: Colonne de `points_km` contenant la valeur kilométrique
+    :return: Dictionnaire du référentiel (axes, arbre, decalage, chainage, km, bornes
+             d'étalonnage par axe, points km et leur index pour les axes non étalonnés)
+    """
+    axes = axes_voie(geometries)
+    arbre = shapely.STRtree(axes)
+    decalage = np.concatenate([[0.0], np.cumsum(shapely.length(axes) + 1.0)[:-1]])
+
+    points = np.asarray(points_km.geometry.values)
+    (i_point, i_axe), distance = arbre.query_nearest(points, return_distance=True, all_matches=False)
+    garder = distance <= tolerance
+    i_point, i_axe = i_point[garder], i_axe[garder]
+    chainage = decalage[i_axe] + shapely.line_locate_point(axes[i_axe], points[i_point])
+    km = points_km[colonne].to_numpy(dtype=float)[i_point]
+
+    # Un seul point par chaînage, triés par axe puis le long de l'axe
+    chainage, unique = np.unique(chainage, return_index=True)
+    km, i_axe = km[unique], i_axe[unique]
+    bornes = np.searchsorted(i_axe, np.arange(len(axes) + 1))
+
+    # Sauts de kilométrage entre deux points voisins (changement de ligne, équation de km):
+    # on n'interpole pas à travers un saut
+    ecart_chainage = np.diff(chainage)
+    saut = np.ones(len(chainage), dtype=bool)
+    saut[1:] = (i_axe[1:] != i_axe[:-1]) | \
+               (np.abs(np.abs(np.diff(km)) * 1000 - ecart_chainage) > TOLERANCE_SAUT * ecart_chainage + 5.0)
+
+    return {"axes": axes, "arbre": arbre, "decalage": decalage, "chainage": chainage, "km": km, "saut": saut,
+            "debut": bornes[:-1], "fin": bornes[1:], "points_km": points_km, "colonne": colonne,
+            "index": index_points_km(points_km)}
+
+
+def km_lineaires(referentiel, points):
+    """
+    Kilométrage exact d'un lot de points par référencement linéaire: projection sur l'axe
+    le plus proche puis interpolation linéaire entre les points km encadrants (linéaire
+    aussi au-delà du premier et du dernier point km de l'axe). Entre deux points km séparés
+    par un saut de kilométrage, le km est extrapolé depuis le côté le plus proche.
+
+    Les points rattachés à un axe qui a moins de deux points km reçoivent la valeur du
+    point km le plus proche (`km_plus_proches`).
+
+    :param referentiel: Référentiel construit avec `referentiel_lineaire`
+    :param points: Géométries ponctuelles (array-like de Points)
+    :return: (km, distance) - kilométrage et distance du point à l'axe de voie
+    """
+    points = np.asarray(points)
+    axes = referentiel["axes"]
+    (_, i_axe), distance = referentiel["arbre"].query_nearest(points, return_distance=True, all_matches=False)
+    chainage = referentiel["decalage"][i_axe] + shapely.line_locate_point(axes[i_axe], points)
+
+    # Paire de points km encadrante, restreinte aux points km du même axe
+    debut, fin = referentiel["debut"][i_axe], referentiel["fin"][i_axe]
+    etalonne = fin - debut >= 2
+    i = np.clip(np.searchsorted(referentiel["chainage"], chainage), debut + 1, np.maximum(fin - 1, debut + 1))
+    i = np.where(etalonne, i, 1)
+
+    # Paire encadrante sur un saut: paire voisine du côté le plus proche, sinon point km le plus proche
+    saut = referentiel["saut"]
+    gauche = chainage - referentiel["chainage"][i - 1] <= referentiel["chainage"][i] - chainage
+    i_voisin = np.where(gauche, i - 1, i + 1)
+    voisin_valide = (i_voisin - 1 >= debut) & (i_voisin <= fin - 1)
+    voisin_valide[voisin_valide] = ~saut[i_voisin[voisin_valide]]
+    sur_saut = saut[i]
+    i = np.where(sur_saut & voisin_valide, i_voisin, i)
+
+    s0, s1 = referentiel["chainage"][i - 1], referentiel["chainage"][i]
+    k0, k1 = referentiel["km"][i - 1], referentiel["km"][i]
+    km = k0 + (chainage - s0) / (s1 - s0) * (k1 - k0)
+    km = np.where(sur_saut & ~voisin_valide, np.where(gauche, k0, k1), km)
+    km = np.where(etalonne, km, np.nan)
+
+    if not etalonne.all():
+        km_proche, _ = km_plus_proches(referentiel["points_km"], points[~etalonne], referentiel["colonne"],
+                                       referentiel["index"])
+        km[~etalonne] = km_proche.astype(float)
+    return km, distance
+
+
+def chainage_sommets(geometries):
+    """
+    Chaînage cumulé des sommets de chaque géométrie (LineString ou MultiLineString),
+    calculé une seule fois. Les parties d'une MultiLineString sont mises bout à bout:
+    le premier sommet d'une partie a le chaînage du dernier sommet de la précédente.
+
+    :return: Dictionnaire (coordonnees (m, 2), partie, cle, debut, fin, longueur) où `cle`
+             est le chaînage décalé par géométrie (tableau trié) et debut/fin les bornes
+             des sommets de chaque géométrie
+    """
+    geometries = np.asarray(geometries)
+    parties, i_geometrie = shapely.get_parts(geometries, return_index=True)
+    coordonnees, i_partie = shapely.get_coordinates(parties, return_index=True)
+
+    # Longueur de chaque arête, nulle entre deux parties
+    arete = np.zeros(len(coordonnees))
+    arete[1:] = np.hypot(*np.diff(coordonnees, axis=0).T)
+    arete[np.r_[True, i_partie[1:] != i_partie[:-1]]] = 0.0
+    geometrie_sommet = i_geometrie[i_partie]
+    bornes = np.searchsorted(geometrie_sommet, np.arange(len(geometries) + 1))
+
+    # Chaînage par géométrie, décalé pour que toutes les géométries tiennent dans un seul tableau trié
+    cumul = np.cumsum(arete)
+    chainage = cumul - np.repeat(cumul[np.minimum(bornes[:-1], len(cumul) - 1)], np.diff(bornes))
+    longueur = np.zeros(len(geometries))
+    remplie = np.diff(bornes) > 0
+    longueur[remplie] = chainage[bornes[1:][remplie] - 1]
+    decalage = np.concatenate([[0.0], np.cumsum(longueur + 1.0)[:-1]])
+    return {"coordonnees": coordonnees, "partie": i_partie, "cle": decalage[geometrie_sommet] + chainage,
+            "decalage": decalage, "debut": bornes[:-1], "fin": bornes[1:], "longueur": longueur}
+
+
+def decouper_lignes(geometries, i_geometrie, debut, fin, sommets=None):
+    """
+    Extrait en une fois les sous-lignes [debut, fin] (chaînage le long de la géométrie,
+    dans l'unité du CRS) de plusieurs géométries, en conservant tous les sommets
+    intermédiaires de la voie.
+
+    Les bornes sont cherchées par recherche dichotomique dans le chaînage cumulé des
+    sommets (`chainage_sommets`), les extrémités sont interpolées sur leur arête et les
+    sommets intérieurs sont copiés par tranches. Une coupe qui traverse plusieurs parties
+    d'une MultiLineString donne une MultiLineString de plusieurs parties.
+
+    :param i_geometrie: Indice positionnel de la géométrie découpée, pour chaque coupe
+    :param debut, fin: Chaînages de début et de fin de chaque coupe
+    :param sommets: Chaînage déjà calculé avec `chainage_sommets` (None = calculé ici)
+    :return: Tableau de MultiLineStrings (vide si la coupe est hors de la géométrie)
+    """
+    if sommets is None:
+        sommets = chainage_sommets(geometries)
+    i_geometrie = np.asarray(i_geometrie, dtype=np.intp)
+    longueur = sommets["longueur"][i_geometrie]
+    debut = np.clip(np.asarray(debut, dtype=float), 0, longueur)
+    fin = np.clip(np.asarray(fin, dtype=float), 0, longueur)
+    n = len(i_geometrie)
+    resultat = np.array([shapely.MultiLineString()] * n, dtype=object)
+    valide = (fin > debut) & (sommets["fin"][i_geometrie] - sommets["debut"][i_geometrie] >= 2)
+    if not valide.any():
+        return resultat
+
+    coupes = np.flatnonzero(valide)
+    cle = sommets["cle"]
+    coordonnees = sommets["coordonnees"]
+    premier = sommets["debut"][i_geometrie[coupes]]
+    dernier = sommets["fin"][i_geometrie[coupes]]
+    cle_debut = sommets["decalage"][i_geometrie[coupes]] + debut[coupes]
+    cle_fin = sommets["decalage"][i_geometrie[coupes]] + fin[coupes]
+
+    def point_sur_arete(j, cle_point):
+        # Interpolation sur l'arête (j - 1, j)
+        c0, c1 = cle[j - 1], cle[j]
+        t = np.divide(cle_point - c0, c1 - c0, out=np.zeros(len(j)), where=c1 > c0)
+        return coordonnees[j - 1] + t[:, None] * (coordonnees[j] - coordonnees[j - 1]), sommets["partie"][j]
+
+    # Sommets intérieurs (debut < chainage < fin); le début est pris sur l'arête suivante
+    # et la fin sur l'arête précédente, pour rester dans la bonne partie
+    bas = np.searchsorted(cle, cle_debut, side="right")
+    haut = np.searchsorted(cle, cle_fin, side="left")
+    xy_debut, partie_debut = point_sur_arete(np.clip(bas, premier + 1, dernier - 1), cle_debut)
+    xy_fin, partie_fin = point_sur_arete(np.clip(haut, premier + 1, dernier - 1), cle_fin)
+
+    nb = np.maximum(haut - bas, 0)
+    total = nb + 2
+    position = np.cumsum(total) - total
+    i_interieur = np.repeat(bas, nb) + np.arange(nb.sum()) - np.repeat(np.cumsum(nb) - nb, nb)
+
+    xy = np.empty((total.sum(), 2))
+    partie = np.empty(total.sum(), dtype=np.intp)
+    coupe = np.repeat(np.arange(len(coupes)), total)
+    rang = np.arange(total.sum()) - np.repeat(position, total)
+    interieur = (rang > 0) & (rang < np.repeat(total, total) - 1)
+    xy[position], partie[position] = xy_debut, partie_debut
+    xy[position + total - 1], partie[position + total - 1] = xy_fin, partie_fin
+    xy[interieur], partie[interieur] = coordonnees[i_interieur], sommets["partie"][i_interieur]
+
+    # Une LineString par (coupe, partie); les morceaux réduits à un point sont écartés
+    nouvelle = np.r_[True, (coupe[1:] != coupe[:-1]) | (partie[1:] != partie[:-1])]
+    i_ligne = np.cumsum(nouvelle) - 1
+    nb_points = np.bincount(i_ligne)
+    garder = nb_points[i_ligne] >= 2
+    if not garder.any():
+        return resultat
+    i_ligne = i_ligne[garder]
+    lignes = shapely.linestrings(xy[garder], indices=np.unique(i_ligne, return_inverse=True)[1])
+    coupe_ligne = coupe[garder][np.r_[True, i_ligne[1:] != i_ligne[:-1]]]
+    avec_lignes, coupe_ligne = np.unique(coupe_ligne, return_inverse=True)
+    resultat[coupes[avec_lignes]] = shapely.multilinestrings(lignes, indices=coupe_ligne)
+    return resultat
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+from intervalles import fusion_intervalles
+from optimisation_meulage import selection_budget, poids_risque, COUT_PAR_METRE, COUT_MOBILISATION, \
+    LONGUEUR_MAX_SECTION
+
+NB_CASES_SIMULATION = 2000  # Résolution du budget par année simulée (pas de budget / 2000)
+GW_REFERENCE = 0.08  # mm, valeur limite utilisée pour calculer les tables StdE
+
+
+def programme_annuel(km_start, km_end, annee, budget, cout_par_metre=COUT_PAR_METRE,
+                     cout_mobilisation=COUT_MOBILISATION, seuil_fusion=0.0, longueur_max=LONGUEUR_MAX_SECTION,
+                     nb_cases_max=NB_CASES_SIMULATION):
+    """
+    Sites à meuler pour une année, avec les règles de `recomm_meulage`: tronçons avec
+    annee ≤ 1, fusionnés en sections (`fusion_intervalles`), puis sélection des sections
+    qui maximise les km pondérés par le risque sous le budget (`selection_budget`).
+
+    :return: (meule, debut, fin, annee_section, cout) - masque des tronçons meulés, et
+             bornes, pire année et coût des sections retenues
+    """
+    candidats = np.flatnonzero(annee <= 1)
+    meule = np.zeros(len(annee), dtype=bool)
+    if len(candidats) == 0:
+        vide = np.empty(0)
+        return meule, vide, vide, vide, vide
+
+    section, debut, fin, annee_section = fusion_intervalles(km_start[candidats], km_end[candidats],
+                                                            seuil_fusion, longueur_max, annee[candidats])
+    longueur = fin - debut
+    cout = longueur * 1000 * cout_par_metre + cout_mobilisation
+    choix = selection_budget(cout, longueur * poids_risque(annee_section), budget, nb_cases_max)
+    meule[candidats[choix[section]]] = True
+    return meule, debut[choix], fin[choix], annee_section[choix], cout[choix]
+
+
+def simuler_campagnes(df_stde, budgets, nb_annees=10, gw=GW_REFERENCE, cout_par_metre=COUT_PAR_METRE,
+                      cout_mobilisation=COUT_MOBILISATION, seuil_fusion=0.0, longueur_max=LONGUEUR_MAX_SECTION,
+                      reserve_apres_meulage=None, nb_cases_max=NB_CASES_SIMULATION):
+    """
+    Simulation année par année des campagnes de meulage d'une ligne, pour plusieurs budgets.
+
+    La réserve d'usure de chaque tronçon StdE diminue chaque année de gw x fréquence
+    (taux de l'élément standard). Chaque année, les sites à meuler sont choisis sous le
+    budget du scénario (`programme_annuel`) et la réserve des tronçons meulés est remise
+    à `reserve_apres_meulage`. L'état de tous les scénarios est un tableau
+    (scénarios, tronçons) avancé en une opération par année; seule la sélection des
+    sites est faite scénario par scénario.
+
+    :param df_stde: Table StdE (km_start, km_end, frequence, reserve_usure_min)
+    :param budgets: Budget annuel par scénario [CHF], (S,) ou (S, nb_annees)
+    :param reserve_apres_meulage: Réserve après meulage [mm] (None = gw, rail sans riffel)
+    :return: (programme, bilan)
+             programme: une ligne par section meulée (scenario, budget, an, km_start, km_end,
+             annee, Longueur [km], cout)
+             bilan: une ligne par scénario et par an (cout, km_meules, km_en_retard,
+             reserve_moyenne), état après les meulages de l'année
+    """
+    budgets = np.asarray(budgets, dtype=float)
+    if budgets.ndim == 0:
+        budgets = budgets[None]
+    if budgets.ndim == 1:
+        budgets = np.repeat(budgets[:, None], nb_annees, axis=1)
+    nb_scenarios = budgets.shape[0]
+    if reserve_apres_meulage is None:
+        reserve_apres_meulage = gw
+
+    km_start = df_stde["km_start"].to_numpy(dtype=float)
+    km_end = df_stde["km_end"].to_numpy(dtype=float)
+    longueur = km_end - km_start
+    usure_annuelle = gw * df_stde["frequence"].to_numpy(dtype=float)
+    reserve = np.tile(df_stde["reserve_usure_min"].to_numpy(dtype=float), (nb_scenarios, 1))
+
+    programme = []
+    bilan = {"scenario": [], "an": [], "cout": [], "km_meules": [], "km_en_retard": [], "reserve_moyenne": []}
+    poids_longueur = longueur / longueur.sum() if longueur.sum() > 0 else longueur
+    for an in range(nb_annees):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            annee = np.where(usure_annuelle > 0, reserve / usure_annuelle, np.inf)
+        annee = np.where(np.isnan(annee), np.inf, annee)
+
+        meule = np.zeros_like(reserve, dtype=bool)
+        cout_an = np.zeros(nb_scenarios)
+        km_an = np.zeros(nb_scenarios)
+        for s in range(nb_scenarios):
+            meule[s], debut, fin, annee_section, cout = programme_annuel(
+                km_start, km_end, annee[s], budgets[s, an], cout_par_metre, cout_mobilisation,
+                seuil_fusion, longueur_max, nb_cases_max)
+            cout_an[s] = cout.sum()
+            km_an[s] = (fin - debut).sum()
+            if len(debut):
+                programme.append(pd.DataFrame({
+                    "scenario": s, "budget": budgets[s, an], "an": an, "km_start": debut, "km_end": fin,
+                    "annee": annee_section, "Longueur": fin - debut, "cout": cout}))
+
+        # Meulage puis usure d'une année, pour tous les scénarios à la fois
+        reserve = np.where(meule, reserve_apres_meulage, reserve)
+        bilan["scenario"].append(np.arange(nb_scenarios))
+        bilan["an"].append(np.full(nb_scenarios, an))
+        bilan["cout"].append(cout_an)
+        bilan["km_meules"].append(km_an)
+        bilan["km_en_retard"].append((reserve <= 0) @ longueur)
+        bilan["reserve_moyenne"].append(reserve @ poids_longueur)
+        reserve = reserve - usure_annuelle
+
+    colonnes = ["scenario", "budget", "an", "km_start", "km_end", "annee", "Longueur", "cout"]
+    programme = pd.concat(programme, ignore_index=True) if programme else pd.DataFrame(columns=colonnes)
+    bilan = pd.DataFrame({cle: np.concatenate(valeurs) for cle, valeurs in bilan.items()})
+    bilan["budget"] = budgets[bilan["scenario"], bilan["an"]]
+    bilan["cout_cumule"] = bilan.groupby("scenario")["cout"].cumsum()
+    return programme, bilan.sort_values(["scenario", "an"], ignore_index=True)
@@ -0,0 +1,71 @@
+import numpy as np
+
+
+def statistiques_groupees(groupes, valeurs):
+    """
+    Calcule en une seule passe, pour chaque groupe et chaque colonne de `valeurs`:
+    nombre de valeurs, moyenne, médiane, skewness et kurtosis (Fisher, biaisés comme scipy).
+
+    Les données sont triées une fois par groupe; les sommes sont faites sur les bornes
+    des groupes (np.add.reduceat) par accumulation des moments centrés. Les NaN sont ignorés
+    colonne par colonne, comme avec `dropna(subset=...)`.
+
+    :param groupes: Identifiant de groupe par mesure (n,)
+    :param valeurs: Valeurs mesurées (n, b), une colonne par bande de Riffel
+    :return: (cles, stats) - cles des groupes triées et dictionnaire de tableaux (k, b):
+             'count', 'mean', 'median', 'skew' (0 si moins de 2 valeurs ou variance nulle),
+             'kurtosis' (NaN si variance nulle); NaN partout si le groupe n'a aucune valeur
+    """
+    groupes = np.asarray(groupes)
+    valeurs = np.asarray(valeurs, dtype=float)
+    if valeurs.ndim == 1:
+        valeurs = valeurs[:, None]
+
+    ordre = np.argsort(groupes, kind="stable")
+    groupes_tri = groupes[ordre]
+    x = valeurs[ordre]
+    cles, debuts = np.unique(groupes_tri, return_index=True)
+
+    valide = ~np.isnan(x)
+    x0 = np.where(valide, x, 0.0)
+    n = np.add.reduceat(valide, debuts, axis=0).astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        moyenne = np.add.reduceat(x0, debuts, axis=0) / n
+
+        # Moments centrés d'ordre 2, 3 et 4
+        ecart = np.where(valide, x - np.repeat(moyenne, np.diff(np.append(debuts, len(x))), axis=0), 0.0)
+        ecart2 = ecart * ecart
+        m2 = np.add.reduceat(ecart2, debuts, axis=0) / n
+        m3 = np.add.reduceat(ecart2 * ecart, debuts, axis=0) / n
+        m4 = np.add.reduceat(ecart2 * ecart2, debuts, axis=0) / n
+
+        # Groupes constants: min == max sur les valeurs valides
+        x_min = np.minimum.reduceat(np.where(valide, x, np.inf), debuts, axis=0)
+        x_max = np.maximum.reduceat(np.where(valide, x, -np.inf), debuts, axis=0)
+        constant = x_min == x_max
+
+        asymetrie = np.where((n > 1) & ~constant, m3 / m2 ** 1.5, 0.0)
+        nul = m2 <= (np.finfo(float).resolution * moyenne) ** 2
+        aplatissement = np.where(nul, np.nan, m4 / m2 ** 2 - 3.0)
+
+    # Médiane: tri des valeurs à l'intérieur de chaque groupe (NaN en fin de groupe)
+    mediane = np.empty_like(moyenne)
+    fins = np.append(debuts, len(x))
+    for j in range(x.shape[1]):
+        tri = np.lexsort((x[:, j], groupes_tri))
+        colonne = x[tri, j]
+        compte = n[:, j].astype(int)
+        bas = debuts + np.maximum(compte - 1, 0) // 2
+        haut = debuts + compte // 2
+        haut = np.minimum(haut, fins[1:] - 1)
+        mediane[:, j] = np.where(compte > 0, (colonne[bas] + colonne[haut]) / 2, np.nan)
+
+    vide = n == 0
+    stats = {
+        "count": n,
+        "mean": moyenne,
+        "median": mediane,
+        "skew": np.where(vide, np.nan, asymetrie),
+        "kurtosis": np.where(vide, np.nan, aplatissement),
+    }
+    return cles, stats
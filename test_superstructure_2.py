@@ -4,6 +4,7 @@ from dash import html
 import plotly.graph_objects as go
 import json
 import pandas as pd
+from couches_geo import lire_attributs
 
 
 def enregistrer_troncons(df_sorted, category_settings, category_mapping, output_file="segments_superieurs.csv"):
@@ -45,9 +46,9 @@ def enregistrer_troncons(df_sorted, category_settings, category_mapping, output_
     df_troncons.to_csv(output_file, index=False)
     print(f"Tronçons enregistrés dans {output_file}")
 
-# Chargement du fichier CSV
-input_file = "segments_avec_km.csv"
-df = pd.read_csv(input_file)
+# Chargement des attributs des segments (sans la géométrie)
+input_file = "segments_avec_km"
+df = lire_attributs(input_file)
 
 # Vérification et correction des inversions km_start/km_end
 df[["km_start", "km_end"]] = df.apply(
@@ -0,0 +1,33 @@
+import numpy as np
+
+from decimation import decimation_min_max
+
+
+def _trace(nb=20000):
+    x = np.arange(nb, dtype=float) * 0.25
+    y = np.sin(x / 50.0)
+    x[5000] = y[5000] = np.nan
+    return x, y
+
+
+def test_plage_absente_toute_la_trace():
+    x, y = _trace()
+    x_tout, y_tout = decimation_min_max(x, y)
+    assert np.nanmin(x_tout) == 0.0 and np.nanmax(x_tout) == x[-1]
+    assert np.nanmax(y_tout) == np.nanmax(y) and np.nanmin(y_tout) == np.nanmin(y)
+
+
+def test_plage_hors_de_la_trace_toute_la_trace():
+    # Plage d'une autre ligne, sans aucun point de cette trace
+    x, y = _trace()
+    x_hors, y_hors = decimation_min_max(x, y, x_range=[90068, 96604])
+    x_tout, y_tout = decimation_min_max(x, y)
+    np.testing.assert_array_equal(x_hors, x_tout)
+    np.testing.assert_array_equal(y_hors, y_tout)
+
+
+def test_plage_zoomee_fenetre_seulement():
+    x, y = _trace()
+    x_zoom, _ = decimation_min_max(x, y, x_range=[1000, 1100])
+    assert len(x_zoom) > 0
+    assert np.nanmin(x_zoom) >= 950 and np.nanmax(x_zoom) <= 1150
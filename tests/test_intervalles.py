@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from intervalles import fusion_intervalles
+
+
+def _fusion_boucle(debut, fin, ecart_max, longueur_max, valeur):
+    """Ancienne fusion ligne à ligne (dashboard.recomm_meulage), référence des tests."""
+    ordre = np.argsort(debut, kind="stable")
+    sections = []
+    courante = None
+    for i in ordre:
+        if (courante is not None and debut[i] - courante[1] <= ecart_max
+                and courante[1] - courante[0] <= longueur_max):
+            courante[1] = max(courante[1], fin[i])
+            courante[2] = min(courante[2], valeur[i])
+        else:
+            courante = [debut[i], fin[i], valeur[i]]
+            sections.append(courante)
+    return np.array(sections).reshape(-1, 3)
+
+
+@pytest.mark.parametrize("chevauchement", [False, True])
+@pytest.mark.parametrize("ecart_max, longueur_max", [(0.0, np.inf), (0.0, 0.85), (0.19, 0.85), (0.15, 0.3)])
+def test_fusion_intervalles_comme_boucle(chevauchement, ecart_max, longueur_max):
+    generateur = np.random.default_rng(0)
+    for _ in range(300):
+        n = generateur.integers(1, 40)
+        if chevauchement:
+            debut = np.round(generateur.uniform(0, 5, n), 2)
+            fin = debut + np.round(generateur.exponential(0.3, n), 2)
+        else:
+            bornes = np.sort(np.round(generateur.uniform(0, 5, 2 * n), 2))
+            debut, fin = bornes[0::2], bornes[1::2]
+            permutation = generateur.permutation(n)
+            debut, fin = debut[permutation], fin[permutation]
+        valeur = generateur.uniform(-3, 2, n)
+
+        section, debut_f, fin_f, valeur_min = fusion_intervalles(debut, fin, ecart_max, longueur_max, valeur)
+        attendu = _fusion_boucle(debut, fin, ecart_max, longueur_max, valeur)
+        np.testing.assert_array_equal(np.column_stack([debut_f, fin_f, valeur_min]), attendu)
+        # Chaque intervalle est dans sa section
+        assert (debut >= debut_f[section]).all() and (fin <= fin_f[section]).all()
+
+
+def test_fusion_intervalles_chevauchement_apres_coupure():
+    # [0, 2] dépasse longueur_max: les intervalles suivants ouvrent de nouvelles sections, et
+    # sa fin (2.0) ne doit pas les rattacher entre eux malgré leur écart
+    debut = np.array([0.0, 0.1, 0.2, 1.0])
+    fin = np.array([2.0, 0.15, 0.3, 1.1])
+    section, debut_f, fin_f, _ = fusion_intervalles(debut, fin, ecart_max=0.0, longueur_max=1.0)
+    np.testing.assert_array_equal(section, [0, 1, 2, 3])
+    np.testing.assert_array_equal(fin_f, fin)
+    # Sans limite de longueur, tout est recouvert par [0, 2]
+    section, debut_f, fin_f, _ = fusion_intervalles(debut, fin, ecart_max=0.0)
+    np.testing.assert_array_equal(section, [0, 0, 0, 0])
+    np.testing.assert_array_equal(fin_f, [2.0])
+
+
+def test_fusion_intervalles_vide():
+    section, debut_f, fin_f, valeur_min = fusion_intervalles([], [])
+    assert len(section) == len(debut_f) == len(fin_f) == 0 and valeur_min is None
@@ -0,0 +1,23 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from optimisation_meulage import selection_budget
+
+
+@pytest.mark.parametrize("taille_bloc", [1, 3, 1024])
+def test_selection_budget_optimale(taille_bloc):
+    generateur = np.random.default_rng(0)
+    for _ in range(100):
+        n = generateur.integers(1, 10)
+        couts = np.round(generateur.uniform(0, 3000, n))
+        valeurs = generateur.uniform(0, 5, n)
+        budget = generateur.uniform(0, couts.sum())
+
+        choix = selection_budget(couts, valeurs, budget, taille_bloc=taille_bloc)
+        assert couts[choix].sum() <= budget
+        # Optimum par énumération (coûts entiers: pas de 1 CHF, pas d'arrondi)
+        meilleure = max(valeurs[list(c)].sum() for k in range(n + 1) for c in itertools.combinations(range(n), k)
+                        if couts[list(c)].sum() <= budget)
+        assert valeurs[choix].sum() == pytest.approx(meilleure)
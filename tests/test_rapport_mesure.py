@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from rapport_mesure import COL_ATM, COL_RAYON, NA_VALUES, ajouter_riffel_cal, charger_rapport, fun_groupe, \
+    table_courbes, transformer_rationnels, transformer_rationnels_serie
+
+
+def test_transformer_rationnels_serie_comme_scalaire():
+    valeurs = [0.0, -0.0, np.nan, 1.0, -1.0, 0.999, -0.999, 0.5, -0.5, 0.4, 1 / 2.5, 2.5e-3, -2.5e-3,
+               1e-3, -1e-5, 1e-300, -1e-308, 5e-324, 350.0, -1200.0, 1e6, -1e12, np.inf, -np.inf]
+    serie = pd.Series(valeurs, index=np.arange(len(valeurs)) * 2, name="rayon")
+
+    resultat = transformer_rationnels_serie(serie)
+    attendu = pd.Series([float(transformer_rationnels(x)) for x in valeurs], index=serie.index, name="rayon")
+    pd.testing.assert_series_equal(resultat, attendu)
+
+
+def test_transformer_rationnels_serie_valeurs_non_numeriques():
+    serie = pd.Series([0.5, "Gerade", -0.002, None], dtype=object)
+    resultat = transformer_rationnels_serie(serie)
+    assert resultat.tolist()[:3] == [transformer_rationnels(x) for x in serie.tolist()[:3]]
+    assert resultat.iloc[3] is None
+
+
+def _fun_groupe_en_memoire(df, ligne, r_min, r_max):
+    """fun_groupe de référence (version d'origine, rapport lu en entier)."""
+    rayon = df[COL_RAYON]
+    df_filtre = df[(rayon >= r_min) & (rayon <= r_max) & (df['Linie'] == ligne)].copy()
+    df_filtre['groupe'] = (df_filtre[COL_RAYON] != df_filtre[COL_RAYON].shift()).cumsum()
+    df_filtre = ajouter_riffel_cal(df_filtre)
+    df_filtre['km_debut'] = df_filtre['von'].groupby(df_filtre['groupe']).transform('min')
+    df_filtre['km_fin'] = df_filtre['bis'].groupby(df_filtre['groupe']).transform('max')
+    df_filtre['rayon_courbe'] = df_filtre[COL_RAYON].groupby(df_filtre['groupe']).transform('mean')
+    df_filtre["long"] = df_filtre["bis"] - df_filtre["von"]
+    return df_filtre
+
+
+def test_fun_groupe_cache_parquet_comme_lecture_complete(tmp_path):
+    rng = np.random.default_rng(4)
+    lignes = ['Palezieux - Chatel-St-Denis', 'Chatel-St-Denis - Montbovon']
+    nb = 6000
+    courbures = rng.choice([0.0, 1 / 350.0, -1 / 420.0, 1 / 580.0, -1 / 1200.0, 1 / 3000.0], size=nb // 50)
+    rapport = pd.DataFrame({
+        'Linie': np.repeat(lignes, nb // 2),
+        'von': np.tile(np.arange(nb // 2) * 0.00025, 2),
+        'bis': np.tile(np.arange(1, nb // 2 + 1) * 0.00025, 2),
+        COL_RAYON: np.repeat(courbures, 50),
+        'Autre': 'x',
+    })
+    for colonne in COL_ATM:
+        rapport[colonne] = rng.random(nb) * 0.1
+    rapport.loc[rng.choice(nb, 30, replace=False), COL_ATM[0]] = np.nan
+    fichier = tmp_path / "report2025-01-08_13-28.csv"
+    rapport.to_csv(fichier, index=False, encoding='latin-1')
+
+    complet = pd.read_csv(fichier, na_values=NA_VALUES, low_memory=False, encoding='latin-1')
+    complet[COL_RAYON] = complet[COL_RAYON].apply(transformer_rationnels)
+    cache = charger_rapport(str(fichier), dossier_cache=str(tmp_path / "cache"), lignes=lignes)
+
+    for ligne in lignes:
+        df_ligne = cache[cache['Linie'] == ligne]
+        courbes = table_courbes(df_ligne)
+        for r_min, r_max in [(0, 600), (0, 60000)]:
+            attendu = _fun_groupe_en_memoire(complet, ligne, r_min, r_max)
+            resultat = fun_groupe(df_ligne, ligne, r_min, r_max, courbes)
+            assert len(resultat) > 0
+            # Le cache ne garde que les colonnes utiles (COLONNES_UTILES)
+            resultat = resultat.drop(columns='campagne').reset_index(drop=True)
+            attendu = attendu[resultat.columns].reset_index(drop=True)
+            # `Linie` est lue comme catégorie depuis les partitions Parquet
+            resultat['Linie'] = resultat['Linie'].astype(attendu['Linie'].dtype)
+            pd.testing.assert_frame_equal(resultat, attendu, check_exact=True)